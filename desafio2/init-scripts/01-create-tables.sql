@@ -1,9 +1,15 @@
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS usuarios (
     id SERIAL PRIMARY KEY,
     nome VARCHAR(100) NOT NULL,
     email VARCHAR(150) UNIQUE NOT NULL,
-    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    busca TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(nome, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(email, '')), 'B')
+    ) STORED
 );
 
 CREATE TABLE IF NOT EXISTS produtos (
@@ -26,6 +32,9 @@ INSERT INTO produtos (nome, descricao, preco, estoque) VALUES
     ('Teclado Mecânico', 'Teclado mecânico RGB, switches blue', 599.90, 15),
 
 CREATE INDEX idx_usuarios_email ON usuarios(email);
+CREATE INDEX idx_usuarios_busca ON usuarios USING GIN (busca);
+CREATE INDEX idx_usuarios_nome_trgm ON usuarios USING GIN (nome gin_trgm_ops);
+CREATE INDEX idx_usuarios_email_trgm ON usuarios USING GIN (email gin_trgm_ops);
 CREATE INDEX idx_produtos_nome ON produtos(nome);
 
 DO $$
@@ -1,13 +1,25 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
     email VARCHAR(150) UNIQUE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Mantida pelo próprio Postgres; nome pesa mais que email no ranking
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(email, '')), 'B')
+    ) STORED
 );
 
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 
+-- Busca por texto (GET /users/search): full-text ranqueado e substring via trigramas
+CREATE INDEX IF NOT EXISTS idx_users_search_vector ON users USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_users_name_trgm ON users USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING GIN (email gin_trgm_ops);
+
 INSERT INTO users (name, email) VALUES
     ('Alice Silva', 'alice@example.com'),
     ('Bob Santos', 'bob@example.com'),
@@ -17,14 +29,69 @@ INSERT INTO users (name, email) VALUES
 ON CONFLICT (email) DO NOTHING;
 
 
+-- Particionada por dia: consultas por período só leem as partições do intervalo
+-- e a retenção é feita removendo partições inteiras, sem DELETE
 CREATE TABLE IF NOT EXISTS access_logs (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     endpoint VARCHAR(255),
     method VARCHAR(10),
     status_code INTEGER,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX IF NOT EXISTS idx_access_logs_timestamp ON access_logs(timestamp);
+
+-- Agregado por minuto, mantido pela aplicação junto com cada lote de logs
+CREATE TABLE IF NOT EXISTS access_logs_minute (
+    minute TIMESTAMP NOT NULL,
+    endpoint VARCHAR(255) NOT NULL,
+    method VARCHAR(10) NOT NULL,
+    status_code INTEGER NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (minute, endpoint, method, status_code)
 );
 
+-- Cria as partições de hoje até `days_ahead` dias à frente e remove as
+-- partições (e agregados) mais antigos que o período de retenção
+CREATE OR REPLACE FUNCTION maintain_access_log_partitions(
+    days_ahead INTEGER,
+    retention_days INTEGER,
+    rollup_retention_days INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    day DATE;
+    old_partition RECORD;
+BEGIN
+    -- Vários workers podem chamar ao mesmo tempo
+    PERFORM pg_advisory_xact_lock(hashtext('access_logs_partitions'));
+
+    FOR day IN
+        SELECT generate_series(CURRENT_DATE, CURRENT_DATE + days_ahead, INTERVAL '1 day')::date
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+            'access_logs_' || to_char(day, 'YYYYMMDD'), day, day + 1
+        );
+    END LOOP;
+
+    FOR old_partition IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'access_logs'::regclass
+          AND c.relname ~ '^access_logs_[0-9]{8}$'
+          AND to_date(substring(c.relname FROM 13), 'YYYYMMDD') < CURRENT_DATE - retention_days
+    LOOP
+        EXECUTE format('DROP TABLE %I', old_partition.relname);
+    END LOOP;
+
+    DELETE FROM access_logs_minute WHERE minute < CURRENT_DATE - rollup_retention_days;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT maintain_access_log_partitions(3, 7, 90);
+
 
 DO $$
 DECLARE
@@ -28,6 +28,23 @@ make_request() {
     fi
 }
 
+# Lê um campo do JSON da resposta (ex.: json_field "$RESPONSE" user.id).
+# As respostas são JSON compacto (o Flask só indenta com debug ativo), então
+# os campos são lidos com o parser em vez de procurados com grep.
+# Imprime vazio se o corpo não for JSON ou o campo não existir.
+json_field() {
+    echo "$1" | python3 -c '
+import json, sys
+try:
+    value = json.load(sys.stdin)
+    for key in sys.argv[1].split("."):
+        value = value[key]
+    print(value)
+except (ValueError, KeyError, IndexError, TypeError):
+    pass
+' "$2"
+}
+
 echo -e "${BLUE}[PASSO 1]${NC} Verificando containers..."
 CONTAINERS=("desafio3-web" "desafio3-db" "desafio3-cache")
 ALL_RUNNING=true
@@ -58,9 +75,9 @@ echo -e "${BLUE}[PASSO 3]${NC} Testando health check (comunicação entre servi
 HEALTH_RESPONSE=$(make_request GET /health)
 echo "$HEALTH_RESPONSE" | python3 -m json.tool 2>/dev/null || echo "$HEALTH_RESPONSE"
 
-if echo "$HEALTH_RESPONSE" | grep -q '"web": "healthy"' && \
-   echo "$HEALTH_RESPONSE" | grep -q '"database": "healthy"' && \
-   echo "$HEALTH_RESPONSE" | grep -q '"cache": "healthy"'; then
+if [ "$(json_field "$HEALTH_RESPONSE" web)" = "healthy" ] && \
+   [ "$(json_field "$HEALTH_RESPONSE" database)" = "healthy" ] && \
+   [ "$(json_field "$HEALTH_RESPONSE" cache)" = "healthy" ]; then
     echo -e "${GREEN}✓ Todos os serviços estão saudáveis!${NC}"
 else
     echo -e "${RED}✗ Alguns serviços não estão saudáveis${NC}"
@@ -76,7 +93,7 @@ echo -e "${BLUE}[PASSO 5]${NC} Listando usuários (busca do DATABASE)..."
 USERS_RESPONSE=$(make_request GET /users)
 echo "$USERS_RESPONSE" | python3 -m json.tool 2>/dev/null
 
-if echo "$USERS_RESPONSE" | grep -q '"source": "database"'; then
+if [ "$(json_field "$USERS_RESPONSE" source)" = "database" ]; then
     echo -e "${GREEN}✓ Dados obtidos do banco de dados PostgreSQL${NC}"
 else
     echo -e "${YELLOW}! Dados obtidos do cache${NC}"
@@ -88,7 +105,7 @@ sleep 1
 USERS_CACHE_RESPONSE=$(make_request GET /users)
 echo "$USERS_CACHE_RESPONSE" | python3 -m json.tool 2>/dev/null
 
-if echo "$USERS_CACHE_RESPONSE" | grep -q '"source": "cache"'; then
+if [ "$(json_field "$USERS_CACHE_RESPONSE" source)" = "cache" ]; then
     echo -e "${GREEN}✓ Dados obtidos do cache Redis!${NC}"
 else
     echo -e "${YELLOW}! Dados ainda vieram do database (cache pode estar desabilitado)${NC}"
@@ -101,9 +118,9 @@ NEW_USER_DATA="{\"name\": \"Teste User ${TIMESTAMP}\", \"email\": \"teste${TIMES
 CREATE_RESPONSE=$(make_request POST /users "$NEW_USER_DATA")
 echo "$CREATE_RESPONSE" | python3 -m json.tool 2>/dev/null
 
-if echo "$CREATE_RESPONSE" | grep -q '"message": "Usuário criado com sucesso"'; then
+if [ "$(json_field "$CREATE_RESPONSE" message)" = "Usuário criado com sucesso" ]; then
     echo -e "${GREEN}✓ Usuário criado com sucesso (dados salvos no PostgreSQL)${NC}"
-    USER_ID=$(echo "$CREATE_RESPONSE" | grep -o '"id": [0-9]*' | grep -o '[0-9]*')
+    USER_ID=$(json_field "$CREATE_RESPONSE" user.id)
     echo -e "${CYAN}ID do novo usuário: ${USER_ID}${NC}"
 else
     echo -e "${RED}✗ Erro ao criar usuário${NC}"
@@ -114,7 +131,7 @@ echo -e "${BLUE}[PASSO 8]${NC} Buscando usuário específico (ID: 1)..."
 USER_RESPONSE=$(make_request GET /users/1)
 echo "$USER_RESPONSE" | python3 -m json.tool 2>/dev/null
 
-if echo "$USER_RESPONSE" | grep -q '"id": 1'; then
+if [ "$(json_field "$USER_RESPONSE" user.id)" = "1" ]; then
     echo -e "${GREEN}✓ Usuário encontrado${NC}"
 else
     echo -e "${YELLOW}! Usuário não encontrado${NC}"
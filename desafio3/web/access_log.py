@@ -0,0 +1,212 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.extras import execute_values
+
+from db import PoolTimeout
+
+
+INSERT_SQL = 'INSERT INTO access_logs (endpoint, method, status_code, timestamp) VALUES %s'
+
+ROLLUP_SQL = """
+    INSERT INTO access_logs_minute (minute, endpoint, method, status_code, count)
+    VALUES %s
+    ON CONFLICT (minute, endpoint, method, status_code)
+    DO UPDATE SET count = access_logs_minute.count + EXCLUDED.count
+"""
+
+MAINTENANCE_SQL = 'SELECT maintain_access_log_partitions(%s, %s, %s)'
+
+TRAFFIC_SQL = """
+    SELECT endpoint, method, status_code, SUM(count)::bigint
+    FROM access_logs_minute
+    WHERE minute >= %s AND minute < %s
+    GROUP BY endpoint, method, status_code
+"""
+
+
+def parse_timestamp(value):
+    # ISO 8601. As colunas são TIMESTAMP (sem fuso) gravadas com datetime.now(),
+    # então um horário com fuso (ex.: 2026-01-01T00:00:00Z) é convertido para o
+    # horário local sem fuso, em vez de falhar ao ser comparado com eles
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def summarize_traffic(start, end, rows):
+    # Agrupa as linhas (endpoint, method, status_code, count) por endpoint,
+    # com o histograma de status de cada um
+    endpoints = {}
+    status_totals = {}
+    total = 0
+    for endpoint, method, status_code, count in rows:
+        entry = endpoints.setdefault((endpoint, method), {
+            'endpoint': endpoint,
+            'method': method,
+            'count': 0,
+            'status': {}
+        })
+        entry['count'] += count
+        entry['status'][str(status_code)] = count
+        status_totals[str(status_code)] = status_totals.get(str(status_code), 0) + count
+        total += count
+
+    return {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'total': total,
+        'status': status_totals,
+        'endpoints': sorted(endpoints.values(), key=lambda e: e['count'], reverse=True)
+    }
+
+
+class AccessLogWriter:
+    # Registra requisições em `access_logs` sem INSERT no caminho da requisição:
+    # `log()` só enfileira num buffer circular limitado a `capacity` entradas e
+    # uma thread de fundo grava em lotes (execute_values) a cada `batch_size`
+    # linhas ou `flush_interval` segundos. Com o buffer cheio, a entrada mais
+    # antiga é descartada e contada em `dropped`; a requisição nunca espera.
+    # Cada lote também incrementa, na mesma transação, o agregado por minuto
+    # em `access_logs_minute`; a mesma thread cria as partições diárias dos
+    # próximos dias e remove as que passaram do período de retenção.
+
+    def __init__(self, pool, capacity=10000, batch_size=500, flush_interval=0.5,
+                 partitions_ahead=3, retention_days=7, rollup_retention_days=90,
+                 maintenance_interval=3600):
+        self.pool = pool
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.partitions_ahead = partitions_ahead
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.maintenance_interval = maintenance_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._buffer = deque()
+        self._flusher_pid = None
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        atexit.register(self.flush)
+
+    def _ensure_flusher(self):
+        # A thread é criada por processo (e recriada após um fork)
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        next_maintenance = 0.0
+        while True:
+            if time.monotonic() >= next_maintenance:
+                self.maintain()
+                next_maintenance = time.monotonic() + self.maintenance_interval
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def log(self, endpoint, route, method, status_code, timestamp):
+        # `endpoint` é o caminho requisitado (vai para access_logs); `route` é a
+        # regra do Flask (ex.: /users/<int:user_id>), usada no agregado para
+        # que ids diferentes não virem linhas diferentes
+        self._ensure_flusher()
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self._buffer.popleft()
+                self._dropped += 1
+            self._buffer.append((endpoint[:255], route[:255], method[:10], status_code, timestamp))
+            self._enqueued += 1
+            full_batch = len(self._buffer) >= self.batch_size
+        if full_batch:
+            self._wakeup.set()
+
+    def _take_batch(self):
+        with self._lock:
+            count = min(len(self._buffer), self.batch_size)
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _write(self, batch):
+        rows = [(endpoint, method, status_code, timestamp)
+                for endpoint, _, method, status_code, timestamp in batch]
+        rollup = Counter(
+            (timestamp.replace(second=0, microsecond=0), route, method, status_code)
+            for _, route, method, status_code, timestamp in batch
+        )
+        # Ordem fixa para que workers atualizando as mesmas linhas não entrem em deadlock
+        rollup_rows = [key + (count,) for key, count in sorted(rollup.items())]
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            execute_values(cursor, INSERT_SQL, rows, page_size=len(rows))
+            execute_values(cursor, ROLLUP_SQL, rollup_rows, page_size=len(rollup_rows))
+            conn.commit()
+            cursor.close()
+
+    def flush(self):
+        # Grava tudo o que está no buffer, um lote por vez
+        with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    return
+                try:
+                    try:
+                        self._write(batch)
+                    except errors.CheckViolation:
+                        # Nenhuma partição para a data (ex.: virada do dia antes
+                        # da próxima manutenção): cria e tenta de novo
+                        self.maintain()
+                        self._write(batch)
+                except (psycopg2.Error, PoolTimeout) as e:
+                    # Logs perdidos não são reenfileirados para não acumular sem limite
+                    print(f"Erro ao gravar access logs: {e}")
+                    with self._lock:
+                        self._failed += len(batch)
+                    return
+                with self._lock:
+                    self._written += len(batch)
+                    self._batches += 1
+
+    def maintain(self):
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(MAINTENANCE_SQL, (
+                    self.partitions_ahead,
+                    self.retention_days,
+                    self.rollup_retention_days
+                ))
+                conn.commit()
+                cursor.close()
+        except (psycopg2.Error, PoolTimeout) as e:
+            print(f"Erro na manutenção das partições de access_logs: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'pending': len(self._buffer),
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'batches': self._batches
+            }
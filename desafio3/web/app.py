@@ -1,10 +1,24 @@
-from flask import Flask, jsonify, request
-import psycopg2
+from flask import Flask, Response, jsonify, request, stream_with_context
 import redis
 import os
 import time
+import hashlib
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from access_log import TRAFFIC_SQL, AccessLogWriter, parse_timestamp, summarize_traffic
+from bulk import Rejects, import_users, parse_csv, parse_ndjson
+from cache import LocalCache, ReadThroughCache
+from codec import CacheCodec, render
+from db import ConnectionPool, PoolTimeout
+from health import HealthChecker
+from metrics import Metrics
+from queries import (
+    BIGINT_MAX, USER_BY_ID, USER_INSERT, USERS_BY_IDS, USERS_PAGE,
+    PreparedConnection, UserRecord
+)
+from redis_client import CircuitBreaker, ManagedRedis
+from search import like_pattern, normalize_query, prefix_tsquery, uses_trigrams
 
 app = Flask(__name__)
 
@@ -12,29 +26,255 @@ app = Flask(__name__)
 DATABASE_URL = os.getenv('DATABASE_URL')
 REDIS_HOST = os.getenv('REDIS_HOST', 'cache')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 0.5))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.25))
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 0.5))
+REDIS_RETRIES = int(os.getenv('REDIS_RETRIES', 1))
+REDIS_BREAKER_THRESHOLD = int(os.getenv('REDIS_BREAKER_THRESHOLD', 5))
+REDIS_BREAKER_RESET = float(os.getenv('REDIS_BREAKER_RESET', 1))
+REDIS_BREAKER_MAX_RESET = float(os.getenv('REDIS_BREAKER_MAX_RESET', 30))
 API_SECRET_KEY = os.getenv('API_SECRET_KEY')
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+DB_POOL_VALIDATE_AFTER = float(os.getenv('DB_POOL_VALIDATE_AFTER', 30))
+USERS_PAGE_DEFAULT = int(os.getenv('USERS_PAGE_DEFAULT', 100))
+USERS_PAGE_MAX = int(os.getenv('USERS_PAGE_MAX', 1000))
+USERS_STREAM_BATCH = int(os.getenv('USERS_STREAM_BATCH', 2000))
+USERS_PAGE_TTL = int(os.getenv('USERS_PAGE_TTL', 60))
+USER_TTL = int(os.getenv('USER_TTL', 300))
+CACHE_LOCK_TTL = float(os.getenv('CACHE_LOCK_TTL', 5))
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 30))
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', 0.1))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv('CACHE_EARLY_REFRESH_BETA', 1.0))
+LOCAL_CACHE_SIZE = int(os.getenv('LOCAL_CACHE_SIZE', 1024))
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', 2))
+CACHE_CODEC = os.getenv('CACHE_CODEC', 'msgpack')
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv('CACHE_COMPRESS_MIN_SIZE', 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', 3))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+BULK_MAX_REJECTS = int(os.getenv('BULK_MAX_REJECTS', 1000))
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', 500))
+SEARCH_LIMIT_DEFAULT = int(os.getenv('SEARCH_LIMIT_DEFAULT', 20))
+SEARCH_LIMIT_MAX = int(os.getenv('SEARCH_LIMIT_MAX', 100))
+SEARCH_MAX_LENGTH = int(os.getenv('SEARCH_MAX_LENGTH', 100))
+SEARCH_TTL = int(os.getenv('SEARCH_TTL', 60))
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', 2))
+ACCESS_LOG_BUFFER = int(os.getenv('ACCESS_LOG_BUFFER', 10000))
+ACCESS_LOG_BATCH = int(os.getenv('ACCESS_LOG_BATCH', 500))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv('ACCESS_LOG_FLUSH_INTERVAL', 0.5))
+ACCESS_LOG_PARTITIONS_AHEAD = int(os.getenv('ACCESS_LOG_PARTITIONS_AHEAD', 3))
+ACCESS_LOG_RETENTION_DAYS = int(os.getenv('ACCESS_LOG_RETENTION_DAYS', 7))
+ACCESS_LOG_ROLLUP_RETENTION_DAYS = int(os.getenv('ACCESS_LOG_ROLLUP_RETENTION_DAYS', 90))
+ACCESS_LOG_MAINTENANCE_INTERVAL = float(os.getenv('ACCESS_LOG_MAINTENANCE_INTERVAL', 3600))
 
 
-def get_db_connection():
+db_pool = ConnectionPool(
+    DATABASE_URL,
+    minconn=DB_POOL_MIN,
+    maxconn=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    validate_after=DB_POOL_VALIDATE_AFTER,
+    connection_factory=PreparedConnection
+)
 
-    try:
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
-    except Exception as e:
-        print(f"Erro ao conectar ao banco de dados: {e}")
-        return None
+access_log = AccessLogWriter(
+    db_pool,
+    capacity=ACCESS_LOG_BUFFER,
+    batch_size=ACCESS_LOG_BATCH,
+    flush_interval=ACCESS_LOG_FLUSH_INTERVAL,
+    partitions_ahead=ACCESS_LOG_PARTITIONS_AHEAD,
+    retention_days=ACCESS_LOG_RETENTION_DAYS,
+    rollup_retention_days=ACCESS_LOG_ROLLUP_RETENTION_DAYS,
+    maintenance_interval=ACCESS_LOG_MAINTENANCE_INTERVAL
+)
 
-def get_redis_connection():
+# Conecta sob demanda: com o Redis fora do ar o app sobe e serve direto do
+# banco; o circuit breaker evita pagar o timeout a cada requisição
+redis_client = ManagedRedis(
+    REDIS_HOST,
+    REDIS_PORT,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    pool_timeout=REDIS_POOL_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    connect_timeout=REDIS_CONNECT_TIMEOUT,
+    retries=REDIS_RETRIES,
+    breaker=CircuitBreaker(
+        threshold=REDIS_BREAKER_THRESHOLD,
+        reset_timeout=REDIS_BREAKER_RESET,
+        max_reset_timeout=REDIS_BREAKER_MAX_RESET
+    )
+)
+metrics = Metrics(redis_client, flush_interval=METRICS_FLUSH_INTERVAL)
+local_cache = LocalCache(maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+read_cache = ReadThroughCache(
+    redis_client,
+    lock_ttl=CACHE_LOCK_TTL,
+    stale_ttl=CACHE_STALE_TTL,
+    jitter=CACHE_TTL_JITTER,
+    beta=CACHE_EARLY_REFRESH_BETA,
+    local=local_cache,
+    metrics=metrics,
+    codec=CacheCodec(
+        CACHE_CODEC,
+        compress_min_size=CACHE_COMPRESS_MIN_SIZE,
+        compress_level=CACHE_COMPRESS_LEVEL
+    )
+)
+
+@app.after_request
+def log_access(response):
+    # Apenas enfileira; a gravação em access_logs é feita em lote pelo AccessLogWriter
+    route = request.url_rule.rule if request.url_rule else '<sem rota>'
+    access_log.log(request.path, route, request.method, response.status_code, datetime.now())
+    return response
+
+def check_database():
     try:
-        r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-        r.ping()
-        return r
-    except Exception as e:
-        print(f"Erro ao conectar ao Redis: {e}")
-        return None
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+    except PoolTimeout:
+        return 'unhealthy: pool esgotado'
+    return 'healthy'
+
+def check_cache():
+    redis_client.ping()
+    return 'healthy'
+
+# Banco e cache são verificados em paralelo, em segundo plano; o /health só lê o resultado
+health_checker = HealthChecker(
+    {'database': check_database, 'cache': check_cache},
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_TIMEOUT
+)
+
+def json_response(payload, status=200):
+    # Como jsonify, mas copia os usuários já renderizados (RawJSON) do cache
+    # direto para o corpo, sem json.loads/json.dumps
+    return Response(render(payload), status=status, mimetype='application/json')
 
+def page_etag(page):
+    return hashlib.sha1(render([page['users'], page['pagination']])).hexdigest()
 
-redis_client = get_redis_connection()
+def conditional_json_response(payload, etag):
+    # ETag fraco: o corpo também traz `source`/`cached_at`, que mudam entre
+    # acertos e misses sem que os usuários mudem. Se o cliente já tem esta
+    # versão, responde 304 sem montar o corpo.
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = json_response(payload)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
+
+def load_users_page(after_id, limit):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        USERS_PAGE.execute(cursor, (after_id, limit + 1))
+        users_data = cursor.fetchall()
+        cursor.close()
+    
+    has_more = len(users_data) > limit
+    records = [UserRecord.from_row(row) for row in users_data[:limit]]
+    page = {
+        'users': [record.to_json() for record in records],
+        'pagination': {
+            'after_id': after_id,
+            'limit': limit,
+            'next_after_id': records[-1].id if has_more else None,
+            'has_more': has_more
+        },
+        'cached_at': datetime.now().isoformat()
+    }
+    # Calculado uma vez por carga e guardado junto com a página no cache
+    page['etag'] = page_etag(page)
+    return page
+
+def load_user(user_id):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        USER_BY_ID.execute(cursor, (user_id,))
+        user_data = cursor.fetchone()
+        cursor.close()
+    return UserRecord.from_row(user_data).to_json() if user_data else None
+
+def load_users_by_ids(user_ids):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        USERS_BY_IDS.execute(cursor, (list(user_ids),))
+        users_data = cursor.fetchall()
+        cursor.close()
+    return {row[0]: UserRecord.from_row(row).to_json() for row in users_data}
+
+def load_users_search(query, limit):
+    # Full-text com prefixo (coluna search_vector) ou substring via trigramas
+    # (name/email ILIKE), ambos atendidos por índices GIN; consultas curtas
+    # demais para trigramas usam só o full-text
+    substring_filter = 'OR name ILIKE %(pattern)s OR email ILIKE %(pattern)s' if uses_trigrams(query) else ''
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f'''SELECT {UserRecord.COLUMNS}
+                FROM users, to_tsquery('simple', %(tsquery)s) query
+                WHERE search_vector @@ query {substring_filter}
+                ORDER BY ts_rank(search_vector, query) DESC,
+                         GREATEST(similarity(name, %(q)s), similarity(email, %(q)s)) DESC,
+                         id
+                LIMIT %(limit)s''',
+            {
+                'tsquery': prefix_tsquery(query),
+                'pattern': like_pattern(query),
+                'q': query,
+                'limit': limit
+            }
+        )
+        users_data = cursor.fetchall()
+        cursor.close()
+    return [UserRecord.from_row(row).to_json() for row in users_data]
+
+def parse_time_range():
+    # Período [from, to) em ISO 8601; padrão: última hora
+    end = request.args.get('to')
+    end = parse_timestamp(end) if end else datetime.now()
+    start = request.args.get('from')
+    start = parse_timestamp(start) if start else end - timedelta(hours=1)
+    if start >= end:
+        raise ValueError('from deve ser anterior a to')
+    return start.replace(second=0, microsecond=0), end
+
+def load_traffic(start, end):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TRAFFIC_SQL, (start, end))
+        rows = cursor.fetchall()
+        cursor.close()
+    return summarize_traffic(start, end, rows)
+
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def stream_users(after_id):
+    # Cursor nomeado (server-side): o PostgreSQL envia as linhas em lotes de
+    # USERS_STREAM_BATCH, então a memória não cresce com o tamanho da tabela.
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(name='users_stream')
+        cursor.itersize = USERS_STREAM_BATCH
+        try:
+            cursor.execute(
+                f'SELECT {UserRecord.COLUMNS} FROM users WHERE id > %s ORDER BY id',
+                (after_id,)
+            )
+            for row in cursor:
+                yield json.dumps(UserRecord.from_row(row).to_dict()) + '\n'
+        finally:
+            cursor.close()
 
 @app.route('/')
 def home():
@@ -44,50 +284,34 @@ def home():
         'timestamp': datetime.now().isoformat(),
         'endpoints': {
             '/health': 'Verificar saúde dos serviços',
-            '/users': 'GET: Listar usuários | POST: Criar usuário',
+            '/users': 'GET: Listar usuários (?after_id=&limit=, ?stream=1 para NDJSON) | POST: Criar usuário',
+            '/users/bulk': 'POST: Importar usuários em lote (NDJSON ou CSV)',
+            '/users/batch?ids=1,2,3': 'GET: Obter vários usuários de uma vez',
+            '/users/search?q=': 'GET: Buscar usuários por nome ou email',
             '/users/<id>': 'GET: Obter usuário por ID',
             '/stats': 'Obter estatísticas de acesso',
+            '/stats/traffic?from=&to=': 'Tráfego por endpoint e status no período (agregado por minuto)',
             '/cache/test': 'Testar operações de cache'
         }
     })
 
 @app.route('/health')
 def health():
+    checks, checked_at = health_checker.status()
     health_status = {
         'web': 'healthy',
+        **checks,
+        'checked_at': checked_at,
         'timestamp': datetime.now().isoformat()
     }
     
-    try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT 1')
-            cursor.close()
-            conn.close()
-            health_status['database'] = 'healthy'
-        else:
-            health_status['database'] = 'unhealthy'
-    except Exception as e:
-        health_status['database'] = f'unhealthy: {str(e)}'
-    
-    try:
-        if redis_client:
-            redis_client.ping()
-            health_status['cache'] = 'healthy'
-        else:
-            health_status['cache'] = 'unhealthy'
-    except Exception as e:
-        health_status['cache'] = f'unhealthy: {str(e)}'
-    
-    if redis_client:
-        redis_client.incr('health_checks')
-        health_status['total_health_checks'] = redis_client.get('health_checks')
+    metrics.incr('health_checks')
+    health_status['total_health_checks'] = metrics.value('health_checks')
     
     all_healthy = all(
         v == 'healthy' 
         for k, v in health_status.items() 
-        if k not in ['timestamp', 'total_health_checks']
+        if k not in ['timestamp', 'checked_at', 'total_health_checks']
     )
     
     status_code = 200 if all_healthy else 503
@@ -97,51 +321,46 @@ def health():
 def users():
     
     if request.method == 'GET':
-        cached_users = None
-        if redis_client:
-            cached_users = redis_client.get('users_list')
-            if cached_users:
-                redis_client.incr('cache_hits')
-                return jsonify({
-                    'source': 'cache',
-                    'users': json.loads(cached_users),
-                    'cached_at': redis_client.get('users_list_timestamp')
-                })
+        try:
+            after_id = int(request.args.get('after_id', 0))
+            limit = int(request.args.get('limit', USERS_PAGE_DEFAULT))
+        except ValueError:
+            return jsonify({'error': 'after_id e limit devem ser inteiros'}), 400
+        
+        if not 0 <= after_id <= BIGINT_MAX or limit < 1:
+            return jsonify({'error': f'after_id deve estar entre 0 e {BIGINT_MAX} e limit >= 1'}), 400
         
+        if wants_stream():
+            return Response(
+                stream_with_context(stream_users(after_id)),
+                mimetype='application/x-ndjson'
+            )
+        
+        limit = min(limit, USERS_PAGE_MAX)
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id, name, email, created_at FROM users ORDER BY id')
-            users_data = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            users_list = [
-                {
-                    'id': row[0],
-                    'name': row[1],
-                    'email': row[2],
-                    'created_at': row[3].isoformat() if row[3] else None
-                }
-                for row in users_data
-            ]
-            
-            if redis_client:
-                redis_client.setex(
-                    'users_list', 
-                        60,
-                    json.dumps(users_list)
+            generation = read_cache.generation('users')
+            if generation is None:
+                # Geração desconhecida (Redis fora): uma página em cache pode ser antiga
+                page, source = load_users_page(after_id, limit), 'database'
+            else:
+                page, source = read_cache.get_or_load(
+                    f'users_page:g{generation}:{after_id}:{limit}',
+                    lambda: load_users_page(after_id, limit),
+                    USERS_PAGE_TTL
                 )
-                redis_client.set('users_list_timestamp', datetime.now().isoformat())
-                redis_client.incr('cache_misses')
-            
-            return jsonify({
-                'source': 'database',
-                'users': users_list
-            })
-            
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+        
+        response = {
+            'source': source,
+            'users': page['users'],
+            'pagination': page['pagination']
+        }
+        if source == 'cache':
+            response['cached_at'] = page['cached_at']
+        # Páginas gravadas no cache antes de existir o campo `etag`
+        etag = page.get('etag') or page_etag(page)
+        return conditional_json_response(response, etag)
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -150,94 +369,194 @@ def users():
             return jsonify({'error': 'Nome e email são obrigatórios'}), 400
         
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO users (name, email) VALUES (%s, %s) RETURNING id, name, email, created_at',
-                (data['name'], data['email'])
-            )
-            new_user = cursor.fetchone()
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with db_pool.connection() as conn:
+                cursor = conn.cursor()
+                USER_INSERT.execute(cursor, (data['name'], data['email']))
+                new_user = cursor.fetchone()
+                conn.commit()
+                cursor.close()
             
-            if redis_client:
-                redis_client.delete('users_list')
-                redis_client.incr('users_created')
+            record = UserRecord.from_row(new_user)
+            user = record.to_dict()
+            read_cache.set(f'user:{record.id}', record.to_json(), USER_TTL)
+            read_cache.bump_generation('users')
+            metrics.incr('users_created')
             
             return jsonify({
                 'message': 'Usuário criado com sucesso',
-                'user': {
-                    'id': new_user[0],
-                    'name': new_user[1],
-                    'email': new_user[2],
-                    'created_at': new_user[3].isoformat()
-                }
+                'user': user
             }), 201
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
-@app.route('/users/<int:user_id>')
-def get_user(user_id):
+@app.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
     
-    cache_key = f'user:{user_id}'
-    if redis_client:
-        cached_user = redis_client.get(cache_key)
-        if cached_user:
-            redis_client.incr('cache_hits')
+    rejects = Rejects(BULK_MAX_REJECTS)
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            rows = parse_ndjson(request.stream, rejects)
+        elif request.mimetype == 'text/csv':
+            rows = parse_csv(request.stream, rejects)
+        else:
             return jsonify({
-                'source': 'cache',
-                'user': json.loads(cached_user)
-            })
+                'error': 'Content-Type deve ser application/x-ndjson ou text/csv'
+            }), 415
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, email, created_at FROM users WHERE id = %s', (user_id,))
-        user_data = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if not user_data:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
-        
-        user = {
-            'id': user_data[0],
-            'name': user_data[1],
-            'email': user_data[2],
-            'created_at': user_data[3].isoformat()
+        with db_pool.connection() as conn:
+            inserted = import_users(conn, rows, rejects)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if inserted:
+        read_cache.bump_generation('users')
+        metrics.incr('users_created', inserted)
+    
+    return jsonify({
+        'message': 'Importação concluída',
+        'inserted': inserted,
+        'rejected': rejects.count,
+        'rejects': sorted(rejects.items, key=lambda r: r['line']),
+        'rejects_truncated': rejects.count > len(rejects.items)
+    })
+
+@app.route('/users/search')
+def search_users():
+    
+    query = normalize_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({'error': 'Informe o termo de busca em ?q='}), 400
+    if len(query) > SEARCH_MAX_LENGTH:
+        return jsonify({'error': f'Termo de busca deve ter no máximo {SEARCH_MAX_LENGTH} caracteres'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', SEARCH_LIMIT_DEFAULT))
+    except ValueError:
+        return jsonify({'error': 'limit deve ser inteiro'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit deve ser >= 1'}), 400
+    limit = min(limit, SEARCH_LIMIT_MAX)
+    
+    try:
+        generation = read_cache.generation('users')
+        if generation is None:
+            users_list, source = load_users_search(query, limit), 'database'
+        else:
+            users_list, source = read_cache.get_or_load(
+                f'users_search:g{generation}:{limit}:{query}',
+                lambda: load_users_search(query, limit),
+                SEARCH_TTL
+            )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    return json_response({
+        'source': source,
+        'query': query,
+        'count': len(users_list),
+        'users': users_list
+    })
+
+@app.route('/users/batch')
+def get_users_batch():
+    
+    try:
+        user_ids = [int(part) for part in request.args.get('ids', '').split(',') if part.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids deve ser uma lista de inteiros separados por vírgula'}), 400
+    
+    # Remove repetidos mantendo a ordem de entrada
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return jsonify({'error': 'Informe ao menos um id em ?ids='}), 400
+    if len(user_ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'Máximo de {BATCH_MAX_IDS} ids por requisição'}), 400
+    if any(abs(user_id) > BIGINT_MAX for user_id in user_ids):
+        return jsonify({'error': f'ids devem estar entre -{BIGINT_MAX} e {BIGINT_MAX}'}), 400
+    
+    keys = {f'user:{user_id}': user_id for user_id in user_ids}
+    
+    def loader(missing_keys):
+        loaded = load_users_by_ids([keys[key] for key in missing_keys])
+        return {f'user:{user_id}': user for user_id, user in loaded.items()}
+    
+    try:
+        found, from_cache = read_cache.get_or_load_many(list(keys), loader, USER_TTL)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    users_list = []
+    not_found = []
+    for key, user_id in keys.items():
+        if found.get(key):
+            users_list.append(found[key])
+        else:
+            not_found.append(user_id)
+    
+    return json_response({
+        'users': users_list,
+        'not_found': not_found,
+        'sources': {
+            'cache': from_cache,
+            'database': len(keys) - from_cache
         }
-        
-        if redis_client:
-            redis_client.setex(cache_key, 300, json.dumps(user))
-            redis_client.incr('cache_misses')
-        
-        return jsonify({
-            'source': 'database',
-            'user': user
-        })
-        
+    })
+
+@app.route('/users/<int:user_id>')
+def get_user(user_id):
+    if user_id > BIGINT_MAX:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    
+    try:
+        user, source = read_cache.get_or_load(
+            f'user:{user_id}',
+            lambda: load_user(user_id),
+            USER_TTL
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    if not user:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+    
+    return json_response({
+        'source': source,
+        'user': user
+    })
 
 @app.route('/stats')
 def stats():
     
-    if not redis_client:
-        return jsonify({'error': 'Redis não disponível'}), 503
+    try:
+        counters = metrics.snapshot()
+    except redis.RedisError as e:
+        return jsonify({
+            'error': f'Redis não disponível: {str(e)}',
+            'database_pool': db_pool.stats(),
+            'access_logs': access_log.stats(),
+            'redis_client': redis_client.stats()
+        }), 503
     
     try:
         statistics = {
-            'health_checks': redis_client.get('health_checks') or 0,
-            'cache_hits': redis_client.get('cache_hits') or 0,
-            'cache_misses': redis_client.get('cache_misses') or 0,
-            'users_created': redis_client.get('users_created') or 0,
+            'health_checks': counters.get('health_checks', 0),
+            'cache_hits': counters.get('cache_hits', 0),
+            'cache_misses': counters.get('cache_misses', 0),
+            'cache_refreshes': counters.get('cache_refreshes', 0),
+            'cache_decode_errors': counters.get('cache_decode_errors', 0),
+            'users_created': counters.get('users_created', 0),
+            'database_pool': db_pool.stats(),
+            'access_logs': access_log.stats(),
+            'redis_client': redis_client.stats(),
             'timestamp': datetime.now().isoformat()
         }
         
-        hits = int(statistics['cache_hits'])
-        misses = int(statistics['cache_misses'])
+        hits = statistics['cache_hits']
+        misses = statistics['cache_misses']
         total = hits + misses
         
         if total > 0:
@@ -245,17 +564,38 @@ def stats():
         else:
             statistics['cache_hit_rate'] = "N/A"
         
+        # L1 conta apenas este processo; L2 (Redis) soma todas as réplicas
+        statistics['cache_tiers'] = {
+            'local': local_cache.stats(),
+            'redis': {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': statistics['cache_hit_rate'],
+                'codec': read_cache.codec.name
+            }
+        }
+        
         return jsonify(statistics)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/stats/traffic')
+def traffic_stats():
+
+    try:
+        start, end = parse_time_range()
+    except ValueError as e:
+        return jsonify({'error': f'Período inválido: {str(e)}'}), 400
+
+    try:
+        return jsonify(load_traffic(start, end))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/cache/test')
 def test_cache():
     
-    if not redis_client:
-        return jsonify({'error': 'Redis não disponível'}), 503
-    
     try:
         test_key = 'test_key'
         test_value = f'test_value_{int(time.time())}'
@@ -280,6 +620,8 @@ def test_cache():
             }
         })
         
+    except redis.RedisError as e:
+        return jsonify({'error': f'Redis não disponível: {str(e)}'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -295,15 +637,16 @@ if __name__ == '__main__':
     print("Aguardando serviços...")
     time.sleep(2)
     
-    if get_db_connection():
-        print("Database conectado")
+    if db_pool.warmup():
+        print(f"Database conectado (pool: {DB_POOL_MIN}-{DB_POOL_MAX} conexões)")
     else:
         print("Database não conectado")
     
-    if redis_client:
-        print("Redis conectado")
-    else:
-        print("Redis não conectado")
+    try:
+        redis_client.ping()
+        print(f"Redis conectado (pool: até {REDIS_MAX_CONNECTIONS} conexões)")
+    except redis.RedisError as e:
+        print(f"Redis não conectado: {e}")
     
     print("=" * 50)
     
@@ -0,0 +1,637 @@
+from quart import Quart, Request, Response, jsonify, request
+import asyncpg
+import redis
+import redis.asyncio as aioredis
+import asyncio
+import os
+import time
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from access_log import parse_timestamp, summarize_traffic
+from bulk import (
+    CREATE_STAGING_SQL, MERGE_SQL, REJECTS_SQL,
+    Rejects, add_db_rejects, aiter_lines, aparse_csv, aparse_ndjson
+)
+from cache import LocalCache
+from cache_async import AsyncReadThroughCache
+from codec import CacheCodec, render
+from health_async import AsyncHealthChecker
+from metrics import AsyncMetrics
+from queries import BIGINT_MAX, UserRecord
+from search import like_pattern, normalize_query, prefix_tsquery, uses_trigrams
+
+# Variante ASGI do app.py: mesmos endpoints e mesmas chaves no Redis, mas com
+# asyncpg e redis.asyncio. Rode com: uvicorn app_async:app --host 0.0.0.0 --port 5000
+
+class AppRequest(Request):
+    # Só POST /users/bulk (importação em streaming) fica sem limite de
+    # tamanho e de tempo para o corpo; as demais rotas mantêm
+    # MAX_CONTENT_LENGTH e BODY_TIMEOUT. No Quart o limite de tamanho é
+    # fixado no corpo ao criar a requisição, antes de a rota rodar
+    # (`request.max_content_length` é só leitura), por isso é decidido aqui.
+
+    def __init__(self, method, scheme, path, *args, **kwargs):
+        if method == 'POST' and path == '/users/bulk':
+            kwargs['max_content_length'] = None
+            kwargs['body_timeout'] = None
+        super().__init__(method, scheme, path, *args, **kwargs)
+
+
+app = Quart(__name__)
+app.request_class = AppRequest
+
+
+DATABASE_URL = os.getenv('DATABASE_URL')
+REDIS_HOST = os.getenv('REDIS_HOST', 'cache')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 2))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+USERS_PAGE_DEFAULT = int(os.getenv('USERS_PAGE_DEFAULT', 100))
+USERS_PAGE_MAX = int(os.getenv('USERS_PAGE_MAX', 1000))
+USERS_STREAM_BATCH = int(os.getenv('USERS_STREAM_BATCH', 2000))
+USERS_PAGE_TTL = int(os.getenv('USERS_PAGE_TTL', 60))
+USER_TTL = int(os.getenv('USER_TTL', 300))
+CACHE_LOCK_TTL = float(os.getenv('CACHE_LOCK_TTL', 5))
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', 30))
+CACHE_TTL_JITTER = float(os.getenv('CACHE_TTL_JITTER', 0.1))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv('CACHE_EARLY_REFRESH_BETA', 1.0))
+LOCAL_CACHE_SIZE = int(os.getenv('LOCAL_CACHE_SIZE', 1024))
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', 2))
+CACHE_CODEC = os.getenv('CACHE_CODEC', 'msgpack')
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv('CACHE_COMPRESS_MIN_SIZE', 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', 3))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+BULK_MAX_REJECTS = int(os.getenv('BULK_MAX_REJECTS', 1000))
+BATCH_MAX_IDS = int(os.getenv('BATCH_MAX_IDS', 500))
+SEARCH_LIMIT_DEFAULT = int(os.getenv('SEARCH_LIMIT_DEFAULT', 20))
+SEARCH_LIMIT_MAX = int(os.getenv('SEARCH_LIMIT_MAX', 100))
+SEARCH_MAX_LENGTH = int(os.getenv('SEARCH_MAX_LENGTH', 100))
+SEARCH_TTL = int(os.getenv('SEARCH_TTL', 60))
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', 2))
+
+
+redis_client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+metrics = AsyncMetrics(redis_client, flush_interval=METRICS_FLUSH_INTERVAL)
+local_cache = LocalCache(maxsize=LOCAL_CACHE_SIZE, ttl=LOCAL_CACHE_TTL)
+read_cache = AsyncReadThroughCache(
+    redis_client,
+    lock_ttl=CACHE_LOCK_TTL,
+    stale_ttl=CACHE_STALE_TTL,
+    jitter=CACHE_TTL_JITTER,
+    beta=CACHE_EARLY_REFRESH_BETA,
+    local=local_cache,
+    metrics=metrics,
+    codec=CacheCodec(
+        CACHE_CODEC,
+        compress_min_size=CACHE_COMPRESS_MIN_SIZE,
+        compress_level=CACHE_COMPRESS_LEVEL
+    )
+)
+
+db_pool = None
+background_tasks = []
+pool_waits = {
+    'checkouts': 0,
+    'timeouts': 0,
+    'wait_time_total': 0.0,
+    'wait_time_max': 0.0
+}
+
+@app.before_serving
+async def startup():
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        DATABASE_URL,
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX
+    )
+    background_tasks.append(asyncio.create_task(metrics.run()))
+    background_tasks.append(asyncio.create_task(read_cache.listen()))
+    background_tasks.append(asyncio.create_task(health_checker.run()))
+    print(f"Database conectado (pool asyncpg: {DB_POOL_MIN}-{DB_POOL_MAX} conexões)")
+
+@app.after_serving
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await metrics.flush()
+    await db_pool.close()
+    await redis_client.aclose()
+
+@asynccontextmanager
+async def db_connection():
+    start = time.monotonic()
+    try:
+        conn = await db_pool.acquire(timeout=DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        pool_waits['timeouts'] += 1
+        raise
+    elapsed = time.monotonic() - start
+    pool_waits['checkouts'] += 1
+    pool_waits['wait_time_total'] += elapsed
+    pool_waits['wait_time_max'] = max(pool_waits['wait_time_max'], elapsed)
+    try:
+        yield conn
+    finally:
+        await db_pool.release(conn)
+
+async def check_database():
+    try:
+        async with db_connection() as conn:
+            await conn.fetchval('SELECT 1')
+    except asyncio.TimeoutError:
+        return 'unhealthy: pool esgotado'
+    return 'healthy'
+
+async def check_cache():
+    await redis_client.ping()
+    return 'healthy'
+
+# Banco e cache são verificados em paralelo, numa task de fundo; o /health só lê o resultado
+health_checker = AsyncHealthChecker(
+    {'database': check_database, 'cache': check_cache},
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_TIMEOUT
+)
+
+def pool_stats():
+    checkouts = pool_waits['checkouts']
+    size = db_pool.get_size() if db_pool else 0
+    idle = db_pool.get_idle_size() if db_pool else 0
+    return {
+        'min_size': DB_POOL_MIN,
+        'max_size': DB_POOL_MAX,
+        'in_use': size - idle,
+        'idle': idle,
+        'checkouts': checkouts,
+        'timeouts': pool_waits['timeouts'],
+        'avg_wait_ms': round(pool_waits['wait_time_total'] / checkouts * 1000, 3) if checkouts else 0.0,
+        'max_wait_ms': round(pool_waits['wait_time_max'] * 1000, 3)
+    }
+
+def json_response(payload, status=200):
+    # Como jsonify, mas copia os usuários já renderizados (RawJSON) do cache
+    # direto para o corpo, sem json.loads/json.dumps
+    return Response(render(payload), status=status, mimetype='application/json')
+
+def page_etag(page):
+    return hashlib.sha1(render([page['users'], page['pagination']])).hexdigest()
+
+def conditional_json_response(payload, etag):
+    # ETag fraco: o corpo também traz `source`/`cached_at`, que mudam entre
+    # acertos e misses sem que os usuários mudem. Se o cliente já tem esta
+    # versão, responde 304 sem montar o corpo.
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = json_response(payload)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+    return response
+
+async def load_users_page(after_id, limit):
+    async with db_connection() as conn:
+        users_data = await conn.fetch(
+            'SELECT id, name, email, created_at FROM users WHERE id > $1::bigint ORDER BY id LIMIT $2',
+            after_id, limit + 1
+        )
+
+    has_more = len(users_data) > limit
+    records = [UserRecord.from_row(row) for row in users_data[:limit]]
+    page = {
+        'users': [record.to_json() for record in records],
+        'pagination': {
+            'after_id': after_id,
+            'limit': limit,
+            'next_after_id': records[-1].id if has_more else None,
+            'has_more': has_more
+        },
+        'cached_at': datetime.now().isoformat()
+    }
+    # Calculado uma vez por carga e guardado junto com a página no cache
+    page['etag'] = page_etag(page)
+    return page
+
+async def load_user(user_id):
+    async with db_connection() as conn:
+        user_data = await conn.fetchrow(
+            'SELECT id, name, email, created_at FROM users WHERE id = $1::bigint', user_id
+        )
+    return UserRecord.from_row(user_data).to_json() if user_data else None
+
+async def load_users_by_ids(user_ids):
+    async with db_connection() as conn:
+        users_data = await conn.fetch(
+            'SELECT id, name, email, created_at FROM users WHERE id = ANY($1::bigint[])',
+            list(user_ids)
+        )
+    return {row[0]: UserRecord.from_row(row).to_json() for row in users_data}
+
+async def load_users_search(query, limit):
+    args = [prefix_tsquery(query), query, limit]
+    substring_filter = ''
+    if uses_trigrams(query):
+        # Parâmetro só é enviado quando usado: o asyncpg não aceita $n sem referência
+        args.append(like_pattern(query))
+        substring_filter = 'OR name ILIKE $4 OR email ILIKE $4'
+    async with db_connection() as conn:
+        users_data = await conn.fetch(
+            f'''SELECT id, name, email, created_at
+                FROM users, to_tsquery('simple', $1) query
+                WHERE search_vector @@ query {substring_filter}
+                ORDER BY ts_rank(search_vector, query) DESC,
+                         GREATEST(similarity(name, $2), similarity(email, $2)) DESC,
+                         id
+                LIMIT $3''',
+            *args
+        )
+    return [UserRecord.from_row(row).to_json() for row in users_data]
+
+def parse_time_range():
+    end = request.args.get('to')
+    end = parse_timestamp(end) if end else datetime.now()
+    start = request.args.get('from')
+    start = parse_timestamp(start) if start else end - timedelta(hours=1)
+    if start >= end:
+        raise ValueError('from deve ser anterior a to')
+    return start.replace(second=0, microsecond=0), end
+
+async def load_traffic(start, end):
+    async with db_connection() as conn:
+        rows = await conn.fetch(
+            '''SELECT endpoint, method, status_code, SUM(count)::bigint
+               FROM access_logs_minute
+               WHERE minute >= $1 AND minute < $2
+               GROUP BY endpoint, method, status_code''',
+            start, end
+        )
+    return summarize_traffic(start, end, rows)
+
+def wants_stream():
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+async def stream_users(after_id):
+    # Cursor server-side do asyncpg: busca USERS_STREAM_BATCH linhas por vez
+    async with db_connection() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(
+                'SELECT id, name, email, created_at FROM users WHERE id > $1::bigint ORDER BY id',
+                after_id,
+                prefetch=USERS_STREAM_BATCH
+            ):
+                yield json.dumps(UserRecord.from_row(row).to_dict()) + '\n'
+
+@app.route('/')
+async def home():
+    return jsonify({
+        'status': 'running',
+        'message': 'API Multi-Serviços (async)',
+        'timestamp': datetime.now().isoformat(),
+        'endpoints': {
+            '/health': 'Verificar saúde dos serviços',
+            '/users': 'GET: Listar usuários (?after_id=&limit=, ?stream=1 para NDJSON) | POST: Criar usuário',
+            '/users/bulk': 'POST: Importar usuários em lote (NDJSON ou CSV)',
+            '/users/batch?ids=1,2,3': 'GET: Obter vários usuários de uma vez',
+            '/users/search?q=': 'GET: Buscar usuários por nome ou email',
+            '/users/<id>': 'GET: Obter usuário por ID',
+            '/stats': 'Obter estatísticas de acesso',
+            '/stats/traffic?from=&to=': 'Tráfego por endpoint e status no período (agregado por minuto)',
+            '/cache/test': 'Testar operações de cache'
+        }
+    })
+
+@app.route('/health')
+async def health():
+    checks, checked_at = await health_checker.status()
+    health_status = {
+        'web': 'healthy',
+        **checks,
+        'checked_at': checked_at,
+        'timestamp': datetime.now().isoformat()
+    }
+
+    metrics.incr('health_checks')
+    health_status['total_health_checks'] = metrics.value('health_checks')
+
+    all_healthy = all(
+        v == 'healthy'
+        for k, v in health_status.items()
+        if k not in ['timestamp', 'checked_at', 'total_health_checks']
+    )
+
+    status_code = 200 if all_healthy else 503
+    return jsonify(health_status), status_code
+
+@app.route('/users', methods=['GET', 'POST'])
+async def users():
+
+    if request.method == 'GET':
+        try:
+            after_id = int(request.args.get('after_id', 0))
+            limit = int(request.args.get('limit', USERS_PAGE_DEFAULT))
+        except ValueError:
+            return jsonify({'error': 'after_id e limit devem ser inteiros'}), 400
+
+        if not 0 <= after_id <= BIGINT_MAX or limit < 1:
+            return jsonify({'error': f'after_id deve estar entre 0 e {BIGINT_MAX} e limit >= 1'}), 400
+
+        if wants_stream():
+            response = Response(stream_users(after_id), mimetype='application/x-ndjson')
+            # Sem o RESPONSE_TIMEOUT (60 s) do Quart, que cortaria o stream de
+            # uma tabela grande sem erro nenhum
+            response.timeout = None
+            return response
+
+        limit = min(limit, USERS_PAGE_MAX)
+        try:
+            generation = await read_cache.generation('users')
+            if generation is None:
+                # Geração desconhecida (Redis fora): uma página em cache pode ser antiga
+                page, source = await load_users_page(after_id, limit), 'database'
+            else:
+                page, source = await read_cache.get_or_load(
+                    f'users_page:g{generation}:{after_id}:{limit}',
+                    lambda: load_users_page(after_id, limit),
+                    USERS_PAGE_TTL
+                )
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+        response = {
+            'source': source,
+            'users': page['users'],
+            'pagination': page['pagination']
+        }
+        if source == 'cache':
+            response['cached_at'] = page['cached_at']
+        # Páginas gravadas no cache antes de existir o campo `etag`
+        etag = page.get('etag') or page_etag(page)
+        return conditional_json_response(response, etag)
+
+    data = await request.get_json()
+
+    if not data or 'name' not in data or 'email' not in data:
+        return jsonify({'error': 'Nome e email são obrigatórios'}), 400
+
+    try:
+        async with db_connection() as conn:
+            new_user = await conn.fetchrow(
+                'INSERT INTO users (name, email) VALUES ($1, $2) RETURNING id, name, email, created_at',
+                data['name'], data['email']
+            )
+
+        record = UserRecord.from_row(new_user)
+        user = record.to_dict()
+        await read_cache.set(f'user:{record.id}', record.to_json(), USER_TTL)
+        await read_cache.bump_generation('users')
+        metrics.incr('users_created')
+
+        return jsonify({
+            'message': 'Usuário criado com sucesso',
+            'user': user
+        }), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/users/bulk', methods=['POST'])
+async def bulk_create_users():
+
+    rejects = Rejects(BULK_MAX_REJECTS)
+    lines = aiter_lines(request.body)
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            rows = aparse_ndjson(lines, rejects)
+        elif request.mimetype == 'text/csv':
+            rows = await aparse_csv(lines, rejects)
+        else:
+            return jsonify({
+                'error': 'Content-Type deve ser application/x-ndjson ou text/csv'
+            }), 415
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        async with db_connection() as conn:
+            async with conn.transaction():
+                await conn.execute(CREATE_STAGING_SQL)
+                await conn.copy_records_to_table(
+                    'users_import',
+                    records=rows,
+                    columns=['line_no', 'name', 'email']
+                )
+                db_rejects = await conn.fetch(REJECTS_SQL.format(limit=rejects.limit))
+                status = await conn.execute(MERGE_SQL)
+        inserted = int(status.split()[-1])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    add_db_rejects(rejects, db_rejects)
+    if inserted:
+        await read_cache.bump_generation('users')
+        metrics.incr('users_created', inserted)
+
+    return jsonify({
+        'message': 'Importação concluída',
+        'inserted': inserted,
+        'rejected': rejects.count,
+        'rejects': sorted(rejects.items, key=lambda r: r['line']),
+        'rejects_truncated': rejects.count > len(rejects.items)
+    })
+
+@app.route('/users/search')
+async def search_users():
+
+    query = normalize_query(request.args.get('q', ''))
+    if not query:
+        return jsonify({'error': 'Informe o termo de busca em ?q='}), 400
+    if len(query) > SEARCH_MAX_LENGTH:
+        return jsonify({'error': f'Termo de busca deve ter no máximo {SEARCH_MAX_LENGTH} caracteres'}), 400
+
+    try:
+        limit = int(request.args.get('limit', SEARCH_LIMIT_DEFAULT))
+    except ValueError:
+        return jsonify({'error': 'limit deve ser inteiro'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit deve ser >= 1'}), 400
+    limit = min(limit, SEARCH_LIMIT_MAX)
+
+    try:
+        generation = await read_cache.generation('users')
+        if generation is None:
+            users_list, source = await load_users_search(query, limit), 'database'
+        else:
+            users_list, source = await read_cache.get_or_load(
+                f'users_search:g{generation}:{limit}:{query}',
+                lambda: load_users_search(query, limit),
+                SEARCH_TTL
+            )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return json_response({
+        'source': source,
+        'query': query,
+        'count': len(users_list),
+        'users': users_list
+    })
+
+@app.route('/users/batch')
+async def get_users_batch():
+
+    try:
+        user_ids = [int(part) for part in request.args.get('ids', '').split(',') if part.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids deve ser uma lista de inteiros separados por vírgula'}), 400
+
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return jsonify({'error': 'Informe ao menos um id em ?ids='}), 400
+    if len(user_ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'Máximo de {BATCH_MAX_IDS} ids por requisição'}), 400
+    if any(abs(user_id) > BIGINT_MAX for user_id in user_ids):
+        return jsonify({'error': f'ids devem estar entre -{BIGINT_MAX} e {BIGINT_MAX}'}), 400
+
+    keys = {f'user:{user_id}': user_id for user_id in user_ids}
+
+    async def loader(missing_keys):
+        loaded = await load_users_by_ids([keys[key] for key in missing_keys])
+        return {f'user:{user_id}': user for user_id, user in loaded.items()}
+
+    try:
+        found, from_cache = await read_cache.get_or_load_many(list(keys), loader, USER_TTL)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    users_list = []
+    not_found = []
+    for key, user_id in keys.items():
+        if found.get(key):
+            users_list.append(found[key])
+        else:
+            not_found.append(user_id)
+
+    return json_response({
+        'users': users_list,
+        'not_found': not_found,
+        'sources': {
+            'cache': from_cache,
+            'database': len(keys) - from_cache
+        }
+    })
+
+@app.route('/users/<int:user_id>')
+async def get_user(user_id):
+    if user_id > BIGINT_MAX:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+
+    try:
+        user, source = await read_cache.get_or_load(
+            f'user:{user_id}',
+            lambda: load_user(user_id),
+            USER_TTL
+        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if not user:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
+
+    return json_response({
+        'source': source,
+        'user': user
+    })
+
+@app.route('/stats')
+async def stats():
+
+    try:
+        counters = await metrics.snapshot()
+    except redis.RedisError as e:
+        return jsonify({
+            'error': f'Redis não disponível: {str(e)}',
+            'database_pool': pool_stats()
+        }), 503
+
+    statistics = {
+        'health_checks': counters.get('health_checks', 0),
+        'cache_hits': counters.get('cache_hits', 0),
+        'cache_misses': counters.get('cache_misses', 0),
+        'cache_refreshes': counters.get('cache_refreshes', 0),
+        'cache_decode_errors': counters.get('cache_decode_errors', 0),
+        'cache_coalesced': counters.get('cache_coalesced', 0),
+        'users_created': counters.get('users_created', 0),
+        'database_pool': pool_stats(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+    hits = statistics['cache_hits']
+    misses = statistics['cache_misses']
+    total = hits + misses
+
+    if total > 0:
+        statistics['cache_hit_rate'] = f"{(hits / total * 100):.2f}%"
+    else:
+        statistics['cache_hit_rate'] = "N/A"
+
+    statistics['cache_tiers'] = {
+        'local': local_cache.stats(),
+        'redis': {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': statistics['cache_hit_rate'],
+            'codec': read_cache.codec.name
+        }
+    }
+
+    return jsonify(statistics)
+
+@app.route('/stats/traffic')
+async def traffic_stats():
+
+    try:
+        start, end = parse_time_range()
+    except ValueError as e:
+        return jsonify({'error': f'Período inválido: {str(e)}'}), 400
+
+    try:
+        return jsonify(await load_traffic(start, end))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/cache/test')
+async def test_cache():
+
+    try:
+        test_key = 'test_key'
+        test_value = f'test_value_{int(time.time())}'
+
+        await redis_client.set(test_key, test_value)
+
+        retrieved_value = await redis_client.get(test_key)
+
+        await redis_client.setex('temp_key', 10, 'expires_in_10s')
+        ttl = await redis_client.ttl('temp_key')
+
+        return jsonify({
+            'message': 'Teste de cache executado com sucesso',
+            'operations': {
+                'set': {'key': test_key, 'value': test_value},
+                'get': {'key': test_key, 'value': retrieved_value},
+                'setex': {'key': 'temp_key', 'ttl_seconds': ttl}
+            },
+            'cache_info': {
+                'keys_count': await redis_client.dbsize(),
+                'memory_used': (await redis_client.info('memory'))['used_memory_human']
+            }
+        })
+
+    except redis.RedisError as e:
+        return jsonify({'error': f'Redis não disponível: {str(e)}'}), 503
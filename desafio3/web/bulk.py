@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+
+
+NAME_MAX_LENGTH = 100
+EMAIL_MAX_LENGTH = 150
+
+
+class CopySource:
+    # Adapta um iterador de trechos CSV ao objeto "arquivo" lido pelo
+    # copy_expert, sem acumular o lote inteiro em memória.
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk.encode('utf-8')
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class Rejects:
+    # Guarda no máximo `limit` rejeições para a resposta, mas conta todas
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.items = []
+        self.count = 0
+
+    def add(self, line_no, reason, email=None):
+        self.count += 1
+        if len(self.items) < self.limit:
+            self.items.append({'line': line_no, 'email': email, 'reason': reason})
+
+
+def validate_user(line_no, record, rejects):
+    if not isinstance(record, dict):
+        rejects.add(line_no, 'Registro deve ser um objeto')
+        return None
+
+    name = str(record.get('name') or '').strip()
+    email = str(record.get('email') or '').strip()
+
+    if not name or not email:
+        reason = 'Nome e email são obrigatórios'
+    elif len(name) > NAME_MAX_LENGTH:
+        reason = f'Nome excede {NAME_MAX_LENGTH} caracteres'
+    elif len(email) > EMAIL_MAX_LENGTH:
+        reason = f'Email excede {EMAIL_MAX_LENGTH} caracteres'
+    elif '@' not in email:
+        reason = 'Email inválido'
+    else:
+        return line_no, name, email
+
+    rejects.add(line_no, reason, email or None)
+    return None
+
+
+def parse_ndjson(stream, rejects):
+    for line_no, raw in enumerate(stream, start=1):
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            rejects.add(line_no, 'JSON inválido')
+            continue
+        row = validate_user(line_no, record, rejects)
+        if row:
+            yield row
+
+
+def parse_csv(stream, rejects):
+    # O cabeçalho é lido já aqui para que um CSV inválido vire erro 400
+    # antes de o COPY começar; as linhas seguintes são lidas sob demanda.
+    lines = (raw.decode('utf-8', errors='replace') for raw in stream)
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or not {'name', 'email'} <= set(reader.fieldnames):
+        raise ValueError('CSV deve ter cabeçalho com as colunas name e email')
+
+    def rows():
+        for record in reader:
+            row = validate_user(reader.line_num, record, rejects)
+            if row:
+                yield row
+
+    return rows()
+
+
+def csv_chunks(rows, rows_per_chunk=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE users_import (
+        line_no INTEGER NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(150) NOT NULL
+    ) ON COMMIT DROP
+"""
+
+# Emails repetidos no lote (a partir da 2ª ocorrência) e emails já cadastrados
+REJECTS_SQL = """
+    SELECT line_no, email, reason, count(*) OVER () FROM (
+        SELECT line_no, email, 'Email duplicado no lote' AS reason
+        FROM (
+            SELECT line_no, email,
+                   row_number() OVER (PARTITION BY email ORDER BY line_no) AS occurrence
+            FROM users_import
+        ) ranked
+        WHERE occurrence > 1
+          AND NOT EXISTS (SELECT 1 FROM users u WHERE u.email = ranked.email)
+        UNION ALL
+        SELECT i.line_no, i.email, 'Email já cadastrado'
+        FROM users_import i
+        JOIN users u ON u.email = i.email
+    ) rejected
+    ORDER BY line_no
+    LIMIT {limit:d}
+"""
+
+MERGE_SQL = """
+    INSERT INTO users (name, email)
+    SELECT name, email FROM (
+        SELECT DISTINCT ON (email) line_no, name, email
+        FROM users_import
+        ORDER BY email, line_no
+    ) first_occurrence
+    ORDER BY line_no
+    ON CONFLICT (email) DO NOTHING
+"""
+
+
+def add_db_rejects(rejects, db_rejects):
+    if db_rejects:
+        for line_no, email, reason, _ in db_rejects:
+            rejects.add(line_no, reason, email)
+        # Contabiliza também as rejeições além do LIMIT
+        rejects.count += db_rejects[0][3] - len(db_rejects)
+
+
+def import_users(conn, rows, rejects):
+    # COPY para uma tabela temporária e merge em `users` com ON CONFLICT (email).
+    # Retorna quantos usuários foram inseridos; conflitos vão para `rejects`.
+    cursor = conn.cursor()
+    cursor.execute(CREATE_STAGING_SQL)
+    cursor.copy_expert(
+        'COPY users_import (line_no, name, email) FROM STDIN WITH (FORMAT csv)',
+        CopySource(csv_chunks(rows))
+    )
+
+    cursor.execute(REJECTS_SQL.format(limit=rejects.limit))
+    db_rejects = cursor.fetchall()
+
+    cursor.execute(MERGE_SQL)
+    inserted = cursor.rowcount
+    conn.commit()
+    cursor.close()
+
+    add_db_rejects(rejects, db_rejects)
+    return inserted
+
+
+async def aiter_lines(chunks):
+    # Quebra um corpo recebido em pedaços (async) em linhas
+    buffer = b''
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def aparse_ndjson(lines, rejects):
+    line_no = 0
+    async for raw in lines:
+        line_no += 1
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            rejects.add(line_no, 'JSON inválido')
+            continue
+        row = validate_user(line_no, record, rejects)
+        if row:
+            yield row
+
+
+async def aparse_csv(lines, rejects):
+    # Variante async de parse_csv: cada registro deve ocupar uma única linha
+    lines = aiter(lines)
+    header_line = (await anext(lines, b'')).decode('utf-8', errors='replace')
+    header = next(csv.reader([header_line]), [])
+    if not {'name', 'email'} <= set(header):
+        raise ValueError('CSV deve ter cabeçalho com as colunas name e email')
+
+    async def rows():
+        line_no = 1
+        async for raw in lines:
+            line_no += 1
+            values = next(csv.reader([raw.decode('utf-8', errors='replace')]), [])
+            if not values:
+                continue
+            row = validate_user(line_no, dict(zip(header, values)), rejects)
+            if row:
+                yield row
+
+    return rows()
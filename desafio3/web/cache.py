@@ -0,0 +1,382 @@
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis
+from redis.client import NEVER_DECODE
+
+from codec import CacheCodec
+
+
+MISSING = object()
+
+# Só remove o lock se ele ainda pertencer a quem o adquiriu
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LocalCache:
+    # L1 em memória do processo: LRU limitada por tamanho, com TTL curto.
+
+    def __init__(self, maxsize=1024, ttl=2.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, count=True):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] <= now:
+                del self._data[key]
+                item = None
+            if item is None:
+                if count:
+                    self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'max_size': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': f"{(self.hits / lookups * 100):.2f}%" if lookups else "N/A"
+            }
+
+
+class ReadThroughCache:
+    # Cache read-through sobre o Redis, protegido contra "cache stampede":
+    #  - single-flight: apenas quem obtém o lease (SET NX) vai ao banco num miss;
+    #    os demais aguardam o valor aparecer no Redis;
+    #  - refresh antecipado probabilístico (XFetch) e stale-while-revalidate:
+    #    entradas perto de expirar ou já vencidas continuam sendo servidas
+    #    enquanto uma única thread as recarrega em segundo plano;
+    #  - TTLs com jitter para que chaves criadas juntas não expirem juntas.
+    # Com `local`, um LocalCache (L1) responde antes do Redis (L2); escritas
+    # publicam a chave em `channel` para que as outras réplicas a descartem.
+    # Os envelopes gravados no Redis são serializados por `codec` (codec.py).
+
+    def __init__(self, client, lock_ttl=5.0, lock_wait=2.0, poll_interval=0.05,
+                 stale_ttl=30, jitter=0.1, beta=1.0, negative_ttl=5,
+                 local=None, channel='cache:invalidate', metrics=None, codec=None):
+        self.client = client
+        self.codec = codec or CacheCodec('json')
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.beta = beta
+        self.negative_ttl = negative_ttl
+        self.local = local
+        self.channel = channel
+        self.metrics = metrics
+        self._release_script = client.register_script(RELEASE_LOCK_SCRIPT) if client else None
+
+        self._listener_lock = threading.Lock()
+        self._listener_pid = None
+        self._origin = None
+
+    # ---------- invalidação do L1 via pub/sub ----------
+
+    def _ensure_listener(self):
+        # A thread é criada por processo (e recriada após um fork)
+        if self.local is None or not self.client:
+            return
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._listener_lock:
+            if self._listener_pid == pid:
+                return
+            self._origin = uuid.uuid4().hex
+            self.local.clear()
+            threading.Thread(target=self._listen, daemon=True).start()
+            self._listener_pid = pid
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Mensagens publicadas enquanto estávamos desconectados se perderam
+                self.local.clear()
+                for message in pubsub.listen():
+                    origin, _, key = message['data'].partition('|')
+                    if origin != self._origin:
+                        self.local.delete(key)
+            except redis.RedisError as e:
+                print(f"Erro no canal de invalidação do cache: {e}")
+                time.sleep(1)
+
+    def _publish(self, key):
+        if self.local is None:
+            return
+        try:
+            self.client.publish(self.channel, f'{self._origin}|{key}')
+        except redis.RedisError as e:
+            print(f"Erro ao publicar invalidação de {key}: {e}")
+
+    # ---------- L2 (Redis) ----------
+
+    def _count(self, name):
+        if self.metrics is not None:
+            self.metrics.incr(f'cache_{name}')
+
+    def jittered_ttl(self, ttl):
+        return max(1, int(round(ttl * random.uniform(1 - self.jitter, 1 + self.jitter))))
+
+    def _decode(self, key, raw):
+        # Entrada corrompida, truncada ou de um codec incompatível vira miss
+        # (e é sobrescrita pela próxima carga) em vez de erro na rota
+        if not raw:
+            return None
+        try:
+            return self.codec.decode(raw)
+        except Exception as e:
+            print(f"Erro ao decodificar cache {key}: {e}")
+            self._count('decode_errors')
+            return None
+
+    def _read(self, key):
+        # Valores do cache são binários: lidos sem o decode_responses do cliente
+        raw = self.client.execute_command('GET', key, **{NEVER_DECODE: True})
+        return self._decode(key, raw)
+
+    def _remember(self, key, envelope):
+        if self.local is not None:
+            self.local.set(key, envelope['value'], envelope['expires_at'] - time.time())
+
+    def _write(self, key, value, ttl, delta=0.0, pipe=None):
+        ttl = self.jittered_ttl(ttl if value is not None else self.negative_ttl)
+        envelope = {
+            'value': value,
+            'delta': delta,
+            'expires_at': time.time() + ttl
+        }
+        self._remember(key, envelope)
+        try:
+            (pipe or self.client).set(key, self.codec.encode(envelope), ex=ttl + self.stale_ttl)
+        except redis.RedisError as e:
+            print(f"Erro ao gravar cache {key}: {e}")
+
+    def _acquire(self, key):
+        token = uuid.uuid4().hex
+        if self.client.set(f'lock:{key}', token, nx=True, px=int(self.lock_ttl * 1000)):
+            return token
+        return None
+
+    def _release(self, key, token):
+        try:
+            self._release_script(keys=[f'lock:{key}'], args=[token])
+        except redis.RedisError:
+            pass
+
+    def _load_and_store(self, key, loader, ttl):
+        start = time.monotonic()
+        value = loader()
+        self._write(key, value, ttl, time.monotonic() - start)
+        return value
+
+    def _should_refresh(self, envelope):
+        # XFetch: quanto mais perto do vencimento e mais cara a recomputação
+        # (delta), maior a chance de uma requisição disparar o refresh.
+        remaining = envelope['expires_at'] - time.time()
+        if remaining <= 0:
+            return True
+        return -envelope['delta'] * self.beta * math.log(1.0 - random.random()) >= remaining
+
+    def _refresh_in_background(self, key, loader, ttl, token):
+        def run():
+            try:
+                self._load_and_store(key, loader, ttl)
+                self._count('refreshes')
+            except Exception as e:
+                print(f"Erro ao atualizar cache {key}: {e}")
+            finally:
+                self._release(key, token)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_or_load(self, key, loader, ttl):
+        # Retorna (valor, origem), com origem 'cache' ou 'database'.
+        if not self.client:
+            return loader(), 'database'
+
+        self._ensure_listener()
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not MISSING:
+                return value, 'cache'
+
+        try:
+            envelope = self._read(key)
+            if envelope is not None:
+                self._count('hits')
+                if self._should_refresh(envelope):
+                    token = self._acquire(key)
+                    if token:
+                        self._refresh_in_background(key, loader, ttl, token)
+                else:
+                    self._remember(key, envelope)
+                return envelope['value'], 'cache'
+
+            self._count('misses')
+            token = self._acquire(key)
+        except redis.RedisError:
+            return loader(), 'database'
+
+        if token:
+            try:
+                return self._load_and_store(key, loader, ttl), 'database'
+            finally:
+                self._release(key, token)
+
+        # Outra requisição já está carregando esta chave: aguarda o resultado
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            try:
+                envelope = self._read(key)
+            except redis.RedisError:
+                break
+            if envelope is not None:
+                self._remember(key, envelope)
+                return envelope['value'], 'cache'
+
+        return loader(), 'database'
+
+    def get_or_load_many(self, keys, loader, ttl):
+        # Versão em lote: L1, depois um único MGET no Redis; as chaves que
+        # faltarem são passadas juntas para `loader(chaves) -> {chave: valor}`
+        # e gravadas de volta num único pipeline.
+        # Retorna ({chave: valor}, quantas vieram do cache).
+        if not self.client:
+            loaded = loader(keys)
+            return {key: loaded.get(key) for key in keys}, 0
+
+        self._ensure_listener()
+        values = {}
+        pending = []
+        for key in keys:
+            value = self.local.get(key) if self.local is not None else MISSING
+            if value is MISSING:
+                pending.append(key)
+            else:
+                values[key] = value
+
+        missing = []
+        if pending:
+            try:
+                raws = self.client.execute_command('MGET', *pending, **{NEVER_DECODE: True})
+            except redis.RedisError:
+                raws = [None] * len(pending)
+
+            now = time.time()
+            for key, raw in zip(pending, raws):
+                envelope = self._decode(key, raw)
+                if envelope is not None and envelope['expires_at'] > now:
+                    values[key] = envelope['value']
+                    self._remember(key, envelope)
+                else:
+                    missing.append(key)
+
+            if self.metrics is not None:
+                self.metrics.incr('cache_hits', len(pending) - len(missing))
+                self.metrics.incr('cache_misses', len(missing))
+
+        if missing:
+            loaded = loader(missing)
+            pipe = self.client.pipeline(transaction=False)
+            for key in missing:
+                values[key] = loaded.get(key)
+                self._write(key, values[key], ttl, pipe=pipe)
+            try:
+                pipe.execute()
+            except redis.RedisError as e:
+                print(f"Erro ao gravar cache em lote: {e}")
+
+        return values, len(keys) - len(missing)
+
+    def set(self, key, value, ttl):
+        # Write-through: grava o valor recém-escrito no banco sem esperar um miss
+        if self.client:
+            self._ensure_listener()
+            self._write(key, value, ttl)
+            self._publish(key)
+
+    def generation(self, namespace):
+        # Coleções (ex.: páginas de usuários) incluem a geração na chave;
+        # incrementá-la invalida todas as páginas de uma vez, sem SCAN/DEL.
+        # Retorna None se o Redis não responder: sem a geração atual nenhuma
+        # chave da coleção é confiável, e quem chama deve ir direto ao banco.
+        if not self.client:
+            return 0
+        key = f'generation:{namespace}'
+        self._ensure_listener()
+        if self.local is not None:
+            value = self.local.get(key, count=False)
+            if value is not MISSING:
+                return value
+        try:
+            value = int(self.client.get(key) or 0)
+        except redis.RedisError:
+            return None
+        if self.local is not None:
+            self.local.set(key, value)
+        return value
+
+    def bump_generation(self, namespace):
+        if not self.client:
+            return 0
+        key = f'generation:{namespace}'
+        self._ensure_listener()
+        try:
+            value = self.client.incr(key)
+        except redis.RedisError as e:
+            print(f"Erro ao invalidar geração {namespace}: {e}")
+            return 0
+        if self.local is not None:
+            self.local.set(key, value)
+        self._publish(key)
+        return value
@@ -0,0 +1,293 @@
+import asyncio
+import math
+import random
+import time
+import uuid
+
+import redis
+from redis.client import NEVER_DECODE
+
+from cache import MISSING, RELEASE_LOCK_SCRIPT
+from codec import CacheCodec
+
+
+class AsyncReadThroughCache:
+    # Versão asyncio do ReadThroughCache (cache.py), com o mesmo formato de
+    # envelope e as mesmas chaves, para que as variantes sync e async possam
+    # compartilhar o Redis. Além do lease no Redis, misses concorrentes dentro
+    # do mesmo processo são agrupados numa única task.
+
+    def __init__(self, client, lock_ttl=5.0, lock_wait=2.0, poll_interval=0.05,
+                 stale_ttl=30, jitter=0.1, beta=1.0, negative_ttl=5,
+                 local=None, channel='cache:invalidate', metrics=None, codec=None):
+        self.client = client
+        self.codec = codec or CacheCodec('json')
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.beta = beta
+        self.negative_ttl = negative_ttl
+        self.local = local
+        self.channel = channel
+        self.metrics = metrics
+        self._release_script = client.register_script(RELEASE_LOCK_SCRIPT)
+        self._inflight = {}
+        self._tasks = set()
+        self._origin = uuid.uuid4().hex
+
+    # ---------- invalidação do L1 via pub/sub ----------
+
+    async def listen(self):
+        if self.local is None:
+            return
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Mensagens publicadas enquanto estávamos desconectados se perderam
+                self.local.clear()
+                async for message in pubsub.listen():
+                    origin, _, key = message['data'].partition('|')
+                    if origin != self._origin:
+                        self.local.delete(key)
+            except redis.RedisError as e:
+                print(f"Erro no canal de invalidação do cache: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    async def _publish(self, key):
+        if self.local is None:
+            return
+        try:
+            await self.client.publish(self.channel, f'{self._origin}|{key}')
+        except redis.RedisError as e:
+            print(f"Erro ao publicar invalidação de {key}: {e}")
+
+    # ---------- L2 (Redis) ----------
+
+    def _count(self, name, amount=1):
+        if self.metrics is not None:
+            self.metrics.incr(f'cache_{name}', amount)
+
+    def jittered_ttl(self, ttl):
+        return max(1, int(round(ttl * random.uniform(1 - self.jitter, 1 + self.jitter))))
+
+    def _decode(self, key, raw):
+        # Mesmo tratamento de ReadThroughCache._decode: entrada ilegível é miss
+        if not raw:
+            return None
+        try:
+            return self.codec.decode(raw)
+        except Exception as e:
+            print(f"Erro ao decodificar cache {key}: {e}")
+            self._count('decode_errors')
+            return None
+
+    async def _read(self, key):
+        raw = await self.client.execute_command('GET', key, **{NEVER_DECODE: True})
+        return self._decode(key, raw)
+
+    def _remember(self, key, envelope):
+        if self.local is not None:
+            self.local.set(key, envelope['value'], envelope['expires_at'] - time.time())
+
+    def _envelope(self, key, value, ttl, delta=0.0):
+        ttl = self.jittered_ttl(ttl if value is not None else self.negative_ttl)
+        envelope = {
+            'value': value,
+            'delta': delta,
+            'expires_at': time.time() + ttl
+        }
+        self._remember(key, envelope)
+        return self.codec.encode(envelope), ttl + self.stale_ttl
+
+    async def _write(self, key, value, ttl, delta=0.0):
+        payload, expire = self._envelope(key, value, ttl, delta)
+        try:
+            await self.client.set(key, payload, ex=expire)
+        except redis.RedisError as e:
+            print(f"Erro ao gravar cache {key}: {e}")
+
+    async def _acquire(self, key):
+        token = uuid.uuid4().hex
+        if await self.client.set(f'lock:{key}', token, nx=True, px=int(self.lock_ttl * 1000)):
+            return token
+        return None
+
+    async def _release(self, key, token):
+        try:
+            await self._release_script(keys=[f'lock:{key}'], args=[token])
+        except redis.RedisError:
+            pass
+
+    async def _load_and_store(self, key, loader, ttl):
+        start = time.monotonic()
+        value = await loader()
+        await self._write(key, value, ttl, time.monotonic() - start)
+        return value
+
+    def _should_refresh(self, envelope):
+        remaining = envelope['expires_at'] - time.time()
+        if remaining <= 0:
+            return True
+        return -envelope['delta'] * self.beta * math.log(1.0 - random.random()) >= remaining
+
+    def _spawn(self, coro):
+        # Mantém referência às tasks para que não sejam coletadas antes do fim
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key, loader, ttl, token):
+        try:
+            await self._load_and_store(key, loader, ttl)
+            self._count('refreshes')
+        except Exception as e:
+            print(f"Erro ao atualizar cache {key}: {e}")
+        finally:
+            await self._release(key, token)
+
+    async def get_or_load(self, key, loader, ttl):
+        # Retorna (valor, origem), com origem 'cache' ou 'database'.
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not MISSING:
+                return value, 'cache'
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # Recebe a origem de quem carregou: se ele foi ao banco, esta
+            # requisição também dependeu do banco, e não conta como hit
+            self._count('coalesced')
+            return await asyncio.shield(inflight)
+
+        # A carga roda numa task própria, aguardada via shield por todos: se
+        # o cliente que a iniciou desconectar (o Quart cancela o handler), só
+        # ele é cancelado e os demais continuam esperando o resultado
+        task = asyncio.create_task(self._get_or_load_shared(key, loader, ttl))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evita "Task exception was never retrieved" quando ninguém aguardava
+        if not task.cancelled():
+            task.exception()
+
+    async def _get_or_load_shared(self, key, loader, ttl):
+        try:
+            envelope = await self._read(key)
+            if envelope is not None:
+                self._count('hits')
+                if self._should_refresh(envelope):
+                    token = await self._acquire(key)
+                    if token:
+                        self._spawn(self._refresh(key, loader, ttl, token))
+                else:
+                    self._remember(key, envelope)
+                return envelope['value'], 'cache'
+
+            self._count('misses')
+            token = await self._acquire(key)
+        except redis.RedisError:
+            return await loader(), 'database'
+
+        if token:
+            try:
+                return await self._load_and_store(key, loader, ttl), 'database'
+            finally:
+                await self._release(key, token)
+
+        # Outro processo já está carregando esta chave: aguarda o resultado
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                envelope = await self._read(key)
+            except redis.RedisError:
+                break
+            if envelope is not None:
+                self._remember(key, envelope)
+                return envelope['value'], 'cache'
+
+        return await loader(), 'database'
+
+    async def get_or_load_many(self, keys, loader, ttl):
+        # Mesmo contrato de ReadThroughCache.get_or_load_many, com loader async
+        values = {}
+        pending = []
+        for key in keys:
+            value = self.local.get(key) if self.local is not None else MISSING
+            if value is MISSING:
+                pending.append(key)
+            else:
+                values[key] = value
+
+        missing = []
+        if pending:
+            try:
+                raws = await self.client.execute_command('MGET', *pending, **{NEVER_DECODE: True})
+            except redis.RedisError:
+                raws = [None] * len(pending)
+
+            now = time.time()
+            for key, raw in zip(pending, raws):
+                envelope = self._decode(key, raw)
+                if envelope is not None and envelope['expires_at'] > now:
+                    values[key] = envelope['value']
+                    self._remember(key, envelope)
+                else:
+                    missing.append(key)
+
+            self._count('hits', len(pending) - len(missing))
+            self._count('misses', len(missing))
+
+        if missing:
+            loaded = await loader(missing)
+            pipe = self.client.pipeline(transaction=False)
+            for key in missing:
+                values[key] = loaded.get(key)
+                payload, expire = self._envelope(key, values[key], ttl)
+                pipe.set(key, payload, ex=expire)
+            try:
+                await pipe.execute()
+            except redis.RedisError as e:
+                print(f"Erro ao gravar cache em lote: {e}")
+
+        return values, len(keys) - len(missing)
+
+    async def set(self, key, value, ttl):
+        await self._write(key, value, ttl)
+        await self._publish(key)
+
+    async def generation(self, namespace):
+        # None se o Redis não responder, como em ReadThroughCache.generation
+        key = f'generation:{namespace}'
+        if self.local is not None:
+            value = self.local.get(key, count=False)
+            if value is not MISSING:
+                return value
+        try:
+            value = int(await self.client.get(key) or 0)
+        except redis.RedisError:
+            return None
+        if self.local is not None:
+            self.local.set(key, value)
+        return value
+
+    async def bump_generation(self, namespace):
+        key = f'generation:{namespace}'
+        try:
+            value = await self.client.incr(key)
+        except redis.RedisError as e:
+            print(f"Erro ao invalidar geração {namespace}: {e}")
+            return 0
+        if self.local is not None:
+            self.local.set(key, value)
+        await self._publish(key)
+        return value
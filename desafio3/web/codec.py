@@ -0,0 +1,126 @@
+import json
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Primeiro byte do valor gravado no Redis. JSON nunca começa com esses bytes,
+# então entradas antigas (JSON puro) continuam legíveis depois da troca de codec
+MSGPACK_HEADER = b'\x01'
+ZSTD_MSGPACK_HEADER = b'\x02'
+
+# Tipo de extensão msgpack usado para RawJSON
+RAW_JSON_EXT = 1
+
+COMPACT_SEPARATORS = (',', ':')
+
+
+class RawJSON(bytes):
+    # JSON já renderizado. Guardado no cache como está e inserido na resposta
+    # sem json.loads/json.dumps: um acerto no cache não re-serializa o usuário.
+
+    @classmethod
+    def dumps(cls, value):
+        return cls(json.dumps(value, separators=COMPACT_SEPARATORS).encode())
+
+
+def render(value):
+    # json.dumps em bytes que copia trechos RawJSON sem re-serializá-los
+    if isinstance(value, RawJSON):
+        return bytes(value)
+    if isinstance(value, dict):
+        return b'{' + b','.join(
+            json.dumps(str(key)).encode() + b':' + render(item) for key, item in value.items()
+        ) + b'}'
+    if isinstance(value, (list, tuple)):
+        return b'[' + b','.join(render(item) for item in value) + b']'
+    return json.dumps(value, separators=COMPACT_SEPARATORS).encode()
+
+
+def _pack_default(value):
+    if isinstance(value, RawJSON):
+        return msgpack.ExtType(RAW_JSON_EXT, bytes(value))
+    raise TypeError(f'Tipo não serializável no cache: {type(value).__name__}')
+
+
+def _unpack_ext(code, data):
+    if code == RAW_JSON_EXT:
+        return RawJSON(data)
+    return msgpack.ExtType(code, data)
+
+
+class CacheCodec:
+    # Serialização dos envelopes do cache ({'value', 'delta', 'expires_at'}).
+    #  - 'msgpack': binário, com o envelope gravado como lista (sem repetir os
+    #    nomes dos campos em cada chave); acima de `compress_min_size` bytes
+    #    é comprimido com zstd, se o pacote `zstandard` estiver instalado;
+    #  - 'json': o formato original, texto JSON.
+    # `decode` reconhece todos os formatos pelo primeiro byte, então réplicas
+    # com codecs diferentes podem ler as entradas umas das outras.
+
+    def __init__(self, format='msgpack', compress_min_size=1024, compress_level=3):
+        if format not in ('msgpack', 'json'):
+            raise ValueError(f'Codec de cache desconhecido: {format}')
+        if format == 'msgpack' and msgpack is None:
+            print("Pacote msgpack não instalado; cache usando JSON")
+            format = 'json'
+        self.format = format
+        self.compress_min_size = compress_min_size if zstandard is not None else 0
+        self.compress_level = compress_level
+        # Compressores zstd não são thread-safe: um por thread
+        self._local = threading.local()
+
+    @property
+    def name(self):
+        if self.format == 'msgpack' and self.compress_min_size > 0:
+            return 'msgpack+zstd'
+        return self.format
+
+    def _compressor(self):
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=self.compress_level)
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self):
+        decompressor = getattr(self._local, 'decompressor', None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor()
+            self._local.decompressor = decompressor
+        return decompressor
+
+    def encode(self, envelope):
+        if self.format == 'json':
+            return render(envelope)
+        payload = msgpack.packb(
+            [envelope['value'], envelope['delta'], envelope['expires_at']],
+            use_bin_type=True,
+            strict_types=True,
+            default=_pack_default
+        )
+        if self.compress_min_size and len(payload) >= self.compress_min_size:
+            return ZSTD_MSGPACK_HEADER + self._compressor().compress(payload)
+        return MSGPACK_HEADER + payload
+
+    def decode(self, raw):
+        # Retorna o envelope, ou None (tratado como miss) se o formato
+        # não puder ser lido por este processo
+        header = raw[:1]
+        if header == MSGPACK_HEADER or header == ZSTD_MSGPACK_HEADER:
+            if msgpack is None or (header == ZSTD_MSGPACK_HEADER and zstandard is None):
+                return None
+            payload = raw[1:]
+            if header == ZSTD_MSGPACK_HEADER:
+                payload = self._decompressor().decompress(payload)
+            value, delta, expires_at = msgpack.unpackb(payload, raw=False, ext_hook=_unpack_ext)
+            return {'value': value, 'delta': delta, 'expires_at': expires_at}
+        return json.loads(raw)
@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Pool limitado e thread-safe de conexões psycopg2.
+    # Conexões ociosas há mais de `validate_after` segundos recebem um
+    # SELECT 1 antes de serem entregues; as quebradas são substituídas.
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=5.0, validate_after=30.0,
+                 connection_factory=None):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError('Limites do pool inválidos')
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self.connection_factory = connection_factory
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, connection_factory=self.connection_factory)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _is_usable(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - idle_since < self.validate_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def warmup(self):
+        # Abre `minconn` conexões antecipadamente; falhas não impedem o boot.
+        opened = []
+        try:
+            while len(self._idle) + len(opened) < self.minconn:
+                opened.append(self._connect())
+        except psycopg2.Error as e:
+            print(f"Erro ao aquecer pool do banco de dados: {e}")
+        now = time.monotonic()
+        with self._cond:
+            for conn in opened:
+                self._idle.append((conn, now))
+            self._cond.notify_all()
+        return bool(self._idle)
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._in_use + len(self._idle) < self.maxconn:
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'Nenhuma conexão disponível após {self.timeout}s '
+                        f'(máximo: {self.maxconn})'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._is_usable(conn, idle_since):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._discarded += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += elapsed
+            self._wait_time_max = max(self._wait_time_max, elapsed)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or conn.closed:
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            # Também cobre GeneratorExit quando usado dentro de respostas em streaming
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'connections_created': self._created,
+                'connections_discarded': self._discarded,
+                'avg_wait_ms': round(self._wait_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+                'max_wait_ms': round(self._wait_time_max * 1000, 3),
+            }
@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# Configuração do Gunicorn (modo produção): gunicorn -c gunicorn.conf.py app:app
+# O servidor de desenvolvimento continua disponível com `python app.py`.
+
+bind = '0.0.0.0:5000'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Importa o app uma vez no master, antes do fork dos workers
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Cada worker abre as próprias conexões com o banco depois do fork;
+    # conexões herdadas do master seriam compartilhadas entre processos.
+    from app import DB_POOL_MAX, DB_POOL_MIN, db_pool
+    if db_pool.warmup():
+        print(f"Worker {worker.pid}: database conectado (pool: {DB_POOL_MIN}-{DB_POOL_MAX} conexões)")
+    else:
+        print(f"Worker {worker.pid}: database não conectado")
+
+
+def worker_exit(server, worker):
+    # Grava o que ainda estiver nos buffers antes de o worker terminar
+    from app import access_log, metrics
+    access_log.flush()
+    metrics.flush()
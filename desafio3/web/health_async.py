@@ -0,0 +1,68 @@
+import asyncio
+import time
+from datetime import datetime
+
+
+class AsyncHealthChecker:
+    # Versão asyncio do HealthChecker (health.py): as verificações rodam em
+    # paralelo numa task de fundo (`run()`) a cada `interval` segundos e o
+    # /health só lê o último resultado. `checks` mapeia nome -> função async
+    # que retorna o status ('healthy', ...); exceções viram
+    # 'unhealthy: <erro>' e quem passar de `timeout` segundos é cancelado e
+    # vira 'unhealthy: timeout'.
+
+    def __init__(self, checks, interval=5.0, timeout=2.0):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        # Se a task parar de atualizar, a próxima sonda verifica na hora
+        self.max_age = interval * 3
+        self._results = None
+        self._checked_at = None
+        self._checked_monotonic = 0.0
+        self._refreshing = None
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    async def _check(self, check):
+        try:
+            return await asyncio.wait_for(check(), self.timeout)
+        except asyncio.TimeoutError:
+            return 'unhealthy: timeout'
+        except Exception as e:
+            return f'unhealthy: {str(e)}'
+
+    async def _refresh(self):
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._check(self.checks[name]) for name in names))
+        self._results = dict(zip(names, results))
+        self._checked_at = datetime.now().isoformat()
+        self._checked_monotonic = time.monotonic()
+
+    def _refreshed(self, task):
+        if self._refreshing is task:
+            self._refreshing = None
+
+    def _is_fresh(self):
+        return (
+            self._results is not None
+            and time.monotonic() - self._checked_monotonic <= self.max_age
+        )
+
+    async def refresh(self):
+        # Várias sondas podem encontrar o resultado vencido ao mesmo tempo:
+        # todas aguardam a mesma verificação (shield: uma sonda cancelada não
+        # cancela a verificação das outras)
+        if self._refreshing is None:
+            self._refreshing = asyncio.create_task(self._refresh())
+            self._refreshing.add_done_callback(self._refreshed)
+        await asyncio.shield(self._refreshing)
+
+    async def status(self):
+        # Retorna ({nome: status}, horário da verificação)
+        if not self._is_fresh():
+            await self.refresh()
+        return dict(self._results), self._checked_at
@@ -0,0 +1,130 @@
+import asyncio
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+import redis
+
+
+class Metrics:
+    # Contadores agregados em memória e enviados ao Redis em lote: a cada
+    # `flush_interval` segundos, um único pipeline de HINCRBY grava tudo no
+    # hash `key`. Incrementar um contador não faz nenhuma chamada ao Redis.
+
+    def __init__(self, client, key='stats', flush_interval=1.0):
+        self.client = client
+        self.key = key
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._totals = {}
+        self._flusher_pid = None
+        atexit.register(self.flush)
+
+    def _ensure_flusher(self):
+        # A thread é criada por processo (e recriada após um fork)
+        pid = os.getpid()
+        if self._flusher_pid == pid or not self.client:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def incr(self, name, amount=1):
+        self._ensure_flusher()
+        with self._lock:
+            self._pending[name] += amount
+
+    def value(self, name):
+        # Último total conhecido + incrementos locais ainda não enviados
+        with self._lock:
+            return self._totals.get(name, 0) + self._pending.get(name, 0)
+
+    def flush(self):
+        if not self.client:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+            if not pending:
+                return
+
+            names = list(pending)
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for name in names:
+                    pipe.hincrby(self.key, name, pending[name])
+                results = pipe.execute()
+            except redis.RedisError as e:
+                print(f"Erro ao enviar métricas: {e}")
+                with self._lock:
+                    self._pending.update(pending)
+                return
+
+            with self._lock:
+                self._totals.update(zip(names, results))
+
+    def snapshot(self):
+        # Envia o que está pendente e lê todos os contadores com um HGETALL
+        self.flush()
+        totals = {name: int(value) for name, value in self.client.hgetall(self.key).items()}
+        with self._lock:
+            self._totals.update(totals)
+        return totals
+
+
+class AsyncMetrics:
+    # Equivalente asyncio de Metrics, gravando no mesmo hash do Redis.
+    # `run()` deve ser executado como task de fundo pelo app.
+
+    def __init__(self, client, key='stats', flush_interval=1.0):
+        self.client = client
+        self.key = key
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._totals = {}
+
+    def incr(self, name, amount=1):
+        self._pending[name] += amount
+
+    def value(self, name):
+        return self._totals.get(name, 0) + self._pending.get(name, 0)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+
+        names = list(pending)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for name in names:
+                pipe.hincrby(self.key, name, pending[name])
+            results = await pipe.execute()
+        except redis.RedisError as e:
+            print(f"Erro ao enviar métricas: {e}")
+            self._pending.update(pending)
+            return
+
+        self._totals.update(zip(names, results))
+
+    async def snapshot(self):
+        await self.flush()
+        totals = {name: int(value) for name, value in (await self.client.hgetall(self.key)).items()}
+        self._totals.update(totals)
+        return totals
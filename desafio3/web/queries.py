@@ -0,0 +1,94 @@
+from psycopg2 import errors, extensions
+
+from codec import RawJSON
+
+
+class PreparedConnection(extensions.connection):
+    # Conexão que lembra quais statements já foram preparados nela.
+    # Usada como `connection_factory` do pool: cada conexão prepara cada
+    # consulta uma única vez, na primeira vez em que ela é executada.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class Statement:
+    # Consulta executada via PREPARE/EXECUTE: o Postgres faz parse e
+    # planejamento uma vez por conexão, e não a cada requisição.
+
+    def __init__(self, name, param_types, sql):
+        self.name = name
+        self.param_types = param_types
+        self.sql = sql
+        self._execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(param_types))})"
+
+    def execute(self, cursor, params):
+        conn = cursor.connection
+        if self.name not in conn.prepared:
+            cursor.execute(f"PREPARE {self.name} ({', '.join(self.param_types)}) AS {self.sql}")
+            conn.prepared.add(self.name)
+        try:
+            cursor.execute(self._execute_sql, params)
+        except errors.InvalidSqlStatementName:
+            # Statement removido no servidor (ex.: DISCARD ALL): prepara de novo na próxima vez
+            conn.prepared.discard(self.name)
+            raise
+
+
+class UserRecord:
+    # Linha de `users` com __slots__ (sem __dict__ por instância);
+    # `to_dict()` é o único ponto que define o formato JSON de um usuário.
+
+    __slots__ = ('id', 'name', 'email', 'created_at')
+
+    COLUMNS = 'id, name, email, created_at'
+
+    def __init__(self, id, name, email, created_at):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.created_at = created_at
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def to_json(self):
+        # Renderizado uma vez ao carregar do banco; o cache guarda estes bytes
+        return RawJSON.dumps(self.to_dict())
+
+
+# Maior id que cabe num parâmetro bigint: acima disso o Postgres responde
+# "bigint out of range", então as rotas validam antes de consultar
+BIGINT_MAX = 2 ** 63 - 1
+
+# Ids como bigint (e não integer): um id maior que a coluna comporta só não
+# encontra nada, em vez de "integer out of range"
+USERS_PAGE = Statement(
+    'users_page', ('bigint', 'integer'),
+    f'SELECT {UserRecord.COLUMNS} FROM users WHERE id > $1 ORDER BY id LIMIT $2'
+)
+
+USER_BY_ID = Statement(
+    'user_by_id', ('bigint',),
+    f'SELECT {UserRecord.COLUMNS} FROM users WHERE id = $1'
+)
+
+USERS_BY_IDS = Statement(
+    'users_by_ids', ('bigint[]',),
+    f'SELECT {UserRecord.COLUMNS} FROM users WHERE id = ANY($1)'
+)
+
+USER_INSERT = Statement(
+    'user_insert', ('varchar', 'varchar'),
+    f'INSERT INTO users (name, email) VALUES ($1, $2) RETURNING {UserRecord.COLUMNS}'
+)
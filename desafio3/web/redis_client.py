@@ -0,0 +1,160 @@
+import threading
+import time
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.client import Pipeline, PubSub
+from redis.retry import Retry
+
+
+class CircuitOpen(redis.ConnectionError):
+    # Subclasse de ConnectionError para que todo código que já trata
+    # redis.RedisError (cache, métricas) caia no mesmo caminho de fallback
+    pass
+
+
+class CircuitBreaker:
+    # Após `threshold` falhas de conexão/timeout seguidas o circuito abre e as
+    # chamadas falham na hora (CircuitOpen), sem esperar o timeout do socket.
+    # Passado o tempo de espera, uma única chamada de teste é liberada
+    # (half-open): se funcionar o circuito fecha; se falhar, reabre com o
+    # tempo de espera dobrado, até `max_reset_timeout`.
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=5, reset_timeout=1.0, max_reset_timeout=30.0,
+                 failure_types=(redis.ConnectionError, redis.TimeoutError)):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failure_types = failure_types
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._current_reset = reset_timeout
+        self._retry_at = 0.0
+        self._probing = False
+        self._opened = 0
+        self._short_circuited = 0
+
+    def _before_call(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() >= self._retry_at:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self._short_circuited += 1
+        raise CircuitOpen('Circuito do Redis aberto')
+
+    def _record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._current_reset = self.reset_timeout
+            self._probing = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN:
+                self._current_reset = min(self._current_reset * 2, self.max_reset_timeout)
+            elif self._failures < self.threshold:
+                return
+            if self._state != self.OPEN:
+                self._opened += 1
+            self._state = self.OPEN
+            self._retry_at = time.monotonic() + self._current_reset
+            self._probing = False
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_types:
+            self._record_failure()
+            raise
+        except Exception:
+            # Erro de comando (ex.: NOSCRIPT): o Redis respondeu
+            self._record_success()
+            raise
+        self._record_success()
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'times_opened': self._opened,
+                'short_circuited': self._short_circuited,
+                'retry_in_seconds': round(max(0.0, self._retry_at - time.monotonic()), 3)
+                if self._state == self.OPEN else 0.0
+            }
+
+
+class GuardedPipeline(Pipeline):
+
+    def __init__(self, breaker, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    def execute(self, raise_on_error=True):
+        return self.breaker.call(super().execute, raise_on_error)
+
+
+class ManagedRedis(redis.Redis):
+    # Cliente Redis com pool limitado (BlockingConnectionPool), timeouts
+    # curtos e circuit breaker em todos os comandos e pipelines. Não conecta
+    # na criação: a conexão é aberta (e refeita) sob demanda, então o app
+    # sobe mesmo com o Redis fora do ar e volta a usar o cache sozinho.
+
+    def __init__(self, host, port, max_connections=50, pool_timeout=0.5,
+                 socket_timeout=0.25, connect_timeout=0.5, retries=1, breaker=None):
+        pool = redis.BlockingConnectionPool(
+            host=host,
+            port=port,
+            decode_responses=True,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=30,
+            retry=Retry(ExponentialBackoff(cap=0.1, base=0.01), retries),
+            retry_on_timeout=True
+        )
+        super().__init__(connection_pool=pool)
+        self.breaker = breaker or CircuitBreaker()
+        # Assinaturas pub/sub ficam bloqueadas lendo o socket: usam um pool
+        # próprio, sem socket_timeout, fora do circuit breaker
+        self._pubsub_pool = redis.ConnectionPool(
+            host=host,
+            port=port,
+            decode_responses=True,
+            socket_connect_timeout=connect_timeout,
+            socket_keepalive=True,
+            health_check_interval=30
+        )
+
+    def execute_command(self, *args, **options):
+        return self.breaker.call(super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return GuardedPipeline(
+            self.breaker, self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+    def pubsub(self, **kwargs):
+        return PubSub(self._pubsub_pool, **kwargs)
+
+    def stats(self):
+        return {
+            'max_connections': self.connection_pool.max_connections,
+            'circuit_breaker': self.breaker.stats()
+        }
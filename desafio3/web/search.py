@@ -0,0 +1,28 @@
+import re
+
+
+# Abaixo de 3 caracteres não há trigramas completos e o índice GIN não ajuda
+TRIGRAM_MIN_LENGTH = 3
+
+# Letras e dígitos; `_` e pontuação separam palavras, como no parser do Postgres
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize_query(q):
+    # Minúsculas e espaços colapsados: "  Alice   SILVA" e "alice silva"
+    # caem na mesma chave de cache
+    return ' '.join(q.lower().split())
+
+
+def prefix_tsquery(query):
+    # "ali sil" -> "ali:* & sil:*" (cada palavra como prefixo)
+    return ' & '.join(f'{word}:*' for word in WORD_RE.findall(query))
+
+
+def like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def uses_trigrams(query):
+    return len(query) >= TRIGRAM_MIN_LENGTH
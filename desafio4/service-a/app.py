@@ -1,12 +1,24 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from datetime import datetime, timedelta
 import random
 import os
 
+from response_cache import ResponseCache
+from snapshot import SnapshotStore
+from user_store import UserStore
+
 app = Flask(__name__)
 
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'Service-A')
 SERVICE_PORT = int(os.getenv('SERVICE_PORT', 5001))
+USERS_SNAPSHOT = os.getenv('USERS_SNAPSHOT', '')
+SNAPSHOT_CHECK_INTERVAL = float(os.getenv('SNAPSHOT_CHECK_INTERVAL', 5))
+CHANGE_LOG_SIZE = int(os.getenv('CHANGE_LOG_SIZE', 10000))
+# Definido pelo gunicorn.conf.py; no servidor de desenvolvimento, um por processo
+CHANGE_LOG_EPOCH = os.getenv('CHANGE_LOG_EPOCH')
+
+USER_FIELDS = ('id', 'name', 'email', 'status', 'role', 'registration_date')
+FILTER_FIELDS = ('status', 'role')
 
 USERS_DATABASE = [
     {
@@ -75,6 +87,35 @@ USERS_DATABASE = [
     }
 ]
 
+# Corpos das listagens serializados uma vez por versão dos dados
+response_cache = ResponseCache()
+
+def load_user_store():
+    # Com USERS_SNAPSHOT, os usuários vêm do snapshot mapeado em memória
+    # (recarregado quando o arquivo é substituído); sem ele, ou se o arquivo
+    # não puder ser aberto, dos dados de exemplo acima
+    if USERS_SNAPSHOT:
+        try:
+            return SnapshotStore(
+                USERS_SNAPSHOT,
+                check_interval=SNAPSHOT_CHECK_INTERVAL,
+                on_reload=response_cache.bump
+            )
+        except (OSError, ValueError) as e:
+            print(f"Erro ao abrir snapshot {USERS_SNAPSHOT}: {e}; usando dados de exemplo")
+    return UserStore(
+        USERS_DATABASE,
+        change_log_size=CHANGE_LOG_SIZE,
+        change_log_epoch=CHANGE_LOG_EPOCH,
+        on_change=response_cache.bump
+    )
+
+user_store = load_user_store()
+if isinstance(user_store, SnapshotStore):
+    # Corpos já serializados não passam pelo store: verifica se o snapshot
+    # foi trocado antes de cada requisição
+    app.before_request(user_store.refresh)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -84,8 +125,9 @@ def home():
         "endpoints": {
             "/": "Informações do serviço",
             "/health": "Health check",
-            "/users": "Lista todos os usuários",
+            "/users": "Lista usuários (?status=&role=&fields=id,name,...&offset=&limit=)",
             "/users/<id>": "Obtém usuário específico por ID",
+            "/users/changes?since=<seq>&epoch=<epoch>": "Mudanças desde <seq> (ou todos os usuários, para ressincronizar)",
             "/users/status/<status>": "Filtra usuários por status",
             "/stats": "Estatísticas de usuários"
         },
@@ -101,18 +143,106 @@ def health():
         "uptime": "running"
     }), 200
 
+def bad_request(message):
+    return jsonify({
+        "service": SERVICE_NAME,
+        "error": message,
+        "timestamp": datetime.now().isoformat()
+    }), 400
+
 @app.route('/users')
 def get_users():
+    # Filtros (status, role), projeção (fields) e paginação (offset, limit)
+    # respondidos pelos índices do store; sem parâmetros, a lista completa
+    filters = {field: request.args[field] for field in FILTER_FIELDS if field in request.args}
+    
+    fields = request.args.get('fields')
+    if fields is not None:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in USER_FIELDS]
+        if not fields or unknown:
+            return bad_request(f"fields deve listar campos entre: {', '.join(USER_FIELDS)}")
+    
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return bad_request("offset e limit devem ser inteiros")
+    
+    if offset < 0 or (limit is not None and limit < 1):
+        return bad_request("offset deve ser >= 0 e limit >= 1")
+    
+    paginated = offset > 0 or limit is not None
+    
+    def build():
+        total, users = user_store.query(filters, offset, limit, fields)
+        payload = {
+            "service": SERVICE_NAME,
+            "total_users": total,
+            "users": users,
+            "timestamp": datetime.now().isoformat()
+        }
+        if filters:
+            payload["filters"] = filters
+        if paginated:
+            payload["pagination"] = {
+                "offset": offset,
+                "limit": limit,
+                "has_more": offset + len(users) < total
+            }
+        return payload
+    
+    # Um corpo por combinação de parâmetros (normalizada)
+    key = 'users'
+    if filters or fields or paginated:
+        key += '?' + '&'.join(
+            [f'{field}={value}' for field, value in sorted(filters.items())] +
+            ([f"fields={','.join(fields)}"] if fields else []) +
+            ([f'offset={offset}&limit={limit}'] if paginated else [])
+        )
+    return response_cache.response(key, build)
+
+@app.route('/users/changes')
+def get_user_changes():
+    # Inserções/alterações/remoções desde `since` no `epoch` informado. Sem
+    # eles, com outro epoch (Service A reiniciado, snapshot trocado) ou se o
+    # log já descartou essas mudanças, devolve todos os usuários com
+    # `resync: true`; o cliente continua a partir do `epoch`/`seq` recebidos.
+    epoch, seq, changes = user_store.changes(
+        request.args.get('epoch'),
+        request.args.get('since', type=int)
+    )
+    
+    if changes is None:
+        def build():
+            epoch, seq, users = user_store.resync()
+            return {
+                "service": SERVICE_NAME,
+                "epoch": epoch,
+                "seq": seq,
+                "resync": True,
+                "total_users": len(users),
+                "users": users,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        # O corpo traz o epoch/seq com que foi montado, então é consistente
+        # mesmo que o seq avance depois
+        return response_cache.response(f'users/changes/{epoch}/{seq}', build)
+    
     return jsonify({
         "service": SERVICE_NAME,
-        "total_users": len(USERS_DATABASE),
-        "users": USERS_DATABASE,
+        "epoch": epoch,
+        "seq": seq,
+        "resync": False,
+        "changes": changes,
         "timestamp": datetime.now().isoformat()
     }), 200
 
 @app.route('/users/<int:user_id>')
 def get_user(user_id):
-    user = next((u for u in USERS_DATABASE if u['id'] == user_id), None)
+    user = user_store.get(user_id)
     
     if user:
         return jsonify({
@@ -130,36 +260,28 @@ def get_user(user_id):
 
 @app.route('/users/status/<status>')
 def get_users_by_status(status):
-    filtered_users = [u for u in USERS_DATABASE if u['status'] == status]
+    def build():
+        filtered_users = user_store.filter('status', status)
+        return {
+            "service": SERVICE_NAME,
+            "status_filter": status,
+            "total_users": len(filtered_users),
+            "users": filtered_users,
+            "timestamp": datetime.now().isoformat()
+        }
     
-    return jsonify({
-        "service": SERVICE_NAME,
-        "status_filter": status,
-        "total_users": len(filtered_users),
-        "users": filtered_users,
-        "timestamp": datetime.now().isoformat()
-    }), 200
+    return response_cache.response(f'users/status/{status}', build)
 
 @app.route('/stats')
 def get_stats():
-
-    status_count = {}
-    role_count = {}
-    
-    for user in USERS_DATABASE:
-        status = user['status']
-        status_count[status] = status_count.get(status, 0) + 1
-        
-        role = user['role']
-        role_count[role] = role_count.get(role, 0) + 1
-    
     return jsonify({
         "service": SERVICE_NAME,
         "statistics": {
-            "total_users": len(USERS_DATABASE),
-            "by_status": status_count,
-            "by_role": role_count
+            "total_users": len(user_store),
+            "by_status": user_store.counts('status'),
+            "by_role": user_store.counts('role')
         },
+        "storage": user_store.stats(),
         "timestamp": datetime.now().isoformat()
     }), 200
 
@@ -183,12 +305,13 @@ if __name__ == '__main__':
     print("=" * 60)
     print(f"Iniciando {SERVICE_NAME}")
     print("=" * 60)
-    print(f"Total de usuários: {len(USERS_DATABASE)}")
+    print(f"Total de usuários: {len(user_store)} ({user_store.stats()['backend']})")
     print(f"Porta: {SERVICE_PORT}")
     print(f"Endpoints disponíveis:")
     print(f"   - http://localhost:{SERVICE_PORT}/")
     print(f"   - http://localhost:{SERVICE_PORT}/users")
     print(f"   - http://localhost:{SERVICE_PORT}/users/<id>")
+    print(f"   - http://localhost:{SERVICE_PORT}/users/changes?since=<seq>&epoch=<epoch>")
     print(f"   - http://localhost:{SERVICE_PORT}/users/status/<status>")
     print(f"   - http://localhost:{SERVICE_PORT}/stats")
     print("=" * 60)
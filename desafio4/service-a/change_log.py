@@ -0,0 +1,62 @@
+import itertools
+import threading
+import uuid
+from collections import deque
+
+
+class ChangeLog:
+    # Sequência de mudanças (upsert/delete) de um conjunto de usuários, para
+    # consumidores se manterem em dia sem baixar a lista inteira. Cada
+    # mudança recebe um `seq` crescente; o `epoch` identifica a sequência
+    # (um novo conjunto de dados, ou um processo novo, começa outra). Só as
+    # últimas `max_entries` mudanças são guardadas: quem ficou mais para trás
+    # precisa de uma ressincronização completa.
+
+    def __init__(self, epoch=None, max_entries=10000):
+        self.epoch = epoch or uuid.uuid4().hex[:16]
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=max_entries)
+
+    def record(self, op, user_id, user=None):
+        with self._lock:
+            self.seq += 1
+            self._entries.append((self.seq, op, user_id, user))
+            return self.seq
+
+    def since(self, epoch, seq):
+        # (seq atual, mudanças depois de `seq`), com as mudanças None quando
+        # não dá para responder: outro epoch, `seq` à frente do atual ou
+        # mudanças que já saíram do log
+        with self._lock:
+            if epoch != self.epoch or seq is None or seq < 0 or seq > self.seq:
+                return self.seq, None
+            if seq == self.seq:
+                return self.seq, []
+            first = self._entries[0][0] if self._entries else self.seq + 1
+            if seq < first - 1:
+                return self.seq, None
+            entries = list(itertools.islice(self._entries, seq - first + 1, None))
+            current = self.seq
+
+        # Várias mudanças do mesmo usuário viram só a última
+        latest = {}
+        for entry in entries:
+            latest.pop(entry[2], None)
+            latest[entry[2]] = entry
+        changes = []
+        for change_seq, op, user_id, user in latest.values():
+            change = {"seq": change_seq, "op": op, "id": user_id}
+            if user is not None:
+                change["user"] = user
+            changes.append(change)
+        return current, changes
+
+    def stats(self):
+        with self._lock:
+            return {
+                'epoch': self.epoch,
+                'seq': self.seq,
+                'retained': len(self._entries),
+                'max_entries': self._entries.maxlen
+            }
@@ -0,0 +1,24 @@
+import multiprocessing
+import os
+import uuid
+
+# Configuração do Gunicorn (modo produção): gunicorn -c gunicorn.conf.py app:app
+# O servidor de desenvolvimento continua disponível com `python app.py`.
+
+bind = f"0.0.0.0:{os.getenv('SERVICE_PORT', 5001)}"
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+# Importa o app uma vez no master, antes do fork dos workers
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+# Epoch do feed /users/changes com o backend em memória: gerado uma vez no
+# master e herdado pelos workers, que assim respondem todos com o mesmo
+# epoch (com ou sem preload); um novo start do Gunicorn começa outro
+os.environ['CHANGE_LOG_EPOCH'] = uuid.uuid4().hex[:16]
+accesslog = '-'
+errorlog = '-'
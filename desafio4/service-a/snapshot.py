@@ -0,0 +1,482 @@
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import random
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+
+# Arquivo: MAGIC | tamanho do cabeçalho (uint64 LE) | cabeçalho JSON | seções.
+# O cabeçalho descreve onde está cada seção (offsets relativos ao início da
+# área de dados, alinhada em 8 bytes) e traz os dicionários e contadores.
+# Seções:
+#  - id: int64 por linha, em ordem crescente (busca binária);
+#  - <coluna>.offsets (uint64, linhas + 1) e <coluna>.data (UTF-8) para textos;
+#  - <coluna>.codes: uint8 por linha, índice no dicionário da coluna;
+#  - <coluna>.rows.<código>: uint32 com as linhas de cada valor (índice invertido).
+MAGIC = b'USERSNP1'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+CHUNK_ROWS = 65536
+
+STRING_COLUMNS = ('name', 'email', 'registration_date')
+INDEXED_COLUMNS = ('status', 'role')
+MAX_DICTIONARY_SIZE = 255
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def peak_rss_kb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def rss_breakdown_kb():
+    # RssAnon é memória privada do processo; RssFile são páginas do arquivo
+    # mapeado, que ficam no page cache e são compartilhadas entre processos
+    fields = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('RssAnon', 'RssFile'):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields
+
+
+class _ColumnWriter:
+    # Acumula valores de um array tipado e descarrega em blocos num arquivo temporário
+
+    def __init__(self, typecode):
+        self.typecode = typecode
+        self.file = tempfile.TemporaryFile()
+        self._buffer = array(typecode)
+
+    def append(self, value):
+        self._buffer.append(value)
+        if len(self._buffer) >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        self._buffer.tofile(self.file)
+        self._buffer = array(self.typecode)
+
+
+def write_snapshot(path, users):
+    # Grava `users` (dicts em ordem crescente de id) em `path`. O arquivo é
+    # montado ao lado e trocado com os.replace: quem estiver lendo o snapshot
+    # antigo continua com ele até reabrir.
+    if sys.byteorder != 'little':
+        raise RuntimeError('Formato de snapshot exige arquitetura little-endian')
+
+    sections = {'id': _ColumnWriter('q')}
+    blobs = {}
+    offsets = {}
+    for column in STRING_COLUMNS:
+        blobs[column] = tempfile.TemporaryFile()
+        offsets[column] = _ColumnWriter('Q')
+        offsets[column].append(0)
+    codes = {column: _ColumnWriter('B') for column in INDEXED_COLUMNS}
+    dictionaries = {column: {} for column in INDEXED_COLUMNS}
+    postings = {column: {} for column in INDEXED_COLUMNS}
+    sizes = {column: 0 for column in STRING_COLUMNS}
+
+    count = 0
+    last_id = None
+    for user in users:
+        user_id = int(user['id'])
+        if last_id is not None and user_id <= last_id:
+            raise ValueError(f'ids devem estar em ordem crescente (id {user_id} após {last_id})')
+        last_id = user_id
+        sections['id'].append(user_id)
+
+        for column in STRING_COLUMNS:
+            data = str(user[column]).encode()
+            blobs[column].write(data)
+            sizes[column] += len(data)
+            offsets[column].append(sizes[column])
+
+        for column in INDEXED_COLUMNS:
+            dictionary = dictionaries[column]
+            code = dictionary.get(user[column])
+            if code is None:
+                if len(dictionary) >= MAX_DICTIONARY_SIZE:
+                    raise ValueError(f'Coluna {column} tem mais de {MAX_DICTIONARY_SIZE} valores distintos')
+                code = dictionary[user[column]] = len(dictionary)
+                postings[column][code] = _ColumnWriter('I')
+            codes[column].append(code)
+            postings[column][code].append(count)
+        count += 1
+
+    parts = [('id', sections['id'].file, sections['id'])]
+    for column in STRING_COLUMNS:
+        parts.append((f'{column}.offsets', offsets[column].file, offsets[column]))
+        parts.append((f'{column}.data', blobs[column], None))
+    for column in INDEXED_COLUMNS:
+        parts.append((f'{column}.codes', codes[column].file, codes[column]))
+        for code, writer in postings[column].items():
+            parts.append((f'{column}.rows.{code}', writer.file, writer))
+
+    layout = {}
+    position = 0
+    for name, file, writer in parts:
+        if writer is not None:
+            writer.flush()
+        length = file.tell()
+        layout[name] = [position, length]
+        position = _align(position + length)
+
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'count': count,
+        'created_at': datetime.now().isoformat(),
+        'sections': layout,
+        'dictionaries': {
+            column: sorted(dictionary, key=dictionary.get)
+            for column, dictionary in dictionaries.items()
+        },
+        'counts': {
+            column: {
+                value: layout[f'{column}.rows.{code}'][1] // 4
+                for value, code in dictionary.items()
+            }
+            for column, dictionary in dictionaries.items()
+        }
+    }).encode()
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as out:
+        out.write(MAGIC)
+        out.write(struct.pack('<Q', len(header)))
+        out.write(header)
+        out.write(b'\0' * (_align(out.tell()) - out.tell()))
+        data_start = out.tell()
+        for name, file, _ in parts:
+            out.write(b'\0' * (data_start + layout[name][0] - out.tell()))
+            file.seek(0)
+            shutil.copyfileobj(file, out, 1 << 20)
+            file.close()
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class Snapshot:
+    # Leitura de um snapshot via mmap: abrir custa só o parse do cabeçalho,
+    # as linhas são lidas do arquivo sob demanda e as páginas ficam no page
+    # cache do sistema, compartilhadas entre os workers. Mesma interface de
+    # leitura do UserStore (len, get, all, filter, counts, query).
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError('Formato de snapshot exige arquitetura little-endian')
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} não é um snapshot de usuários')
+        header_len, = struct.unpack_from('<Q', view, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(view[header_start:header_start + header_len]))
+        if header['format'] != FORMAT_VERSION:
+            raise ValueError(f"Versão de snapshot não suportada: {header['format']}")
+        data_start = _align(header_start + header_len)
+
+        def section(name, typecode=None):
+            offset, length = header['sections'][name]
+            part = view[data_start + offset:data_start + offset + length]
+            return part.cast(typecode) if typecode else part
+
+        self.count = header['count']
+        self.created_at = header['created_at']
+        self._ids = section('id', 'q')
+        self._strings = {
+            column: (section(f'{column}.offsets', 'Q'), section(f'{column}.data'))
+            for column in STRING_COLUMNS
+        }
+        self._dictionaries = header['dictionaries']
+        self._codes = {column: section(f'{column}.codes', 'B') for column in INDEXED_COLUMNS}
+        self._rows = {
+            column: {
+                value: section(f'{column}.rows.{code}', 'I')
+                for code, value in enumerate(values)
+            }
+            for column, values in self._dictionaries.items()
+        }
+        self._counts = header['counts']
+
+    def __len__(self):
+        return self.count
+
+    def _row(self, index, fields=None):
+        # `fields`: só essas colunas são decodificadas
+        if fields is None:
+            user = {'id': self._ids[index]}
+            for column, (offsets, data) in self._strings.items():
+                user[column] = str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+            for column, codes in self._codes.items():
+                user[column] = self._dictionaries[column][codes[index]]
+            return user
+        user = {}
+        for column in fields:
+            if column == 'id':
+                user[column] = self._ids[index]
+            elif column in self._codes:
+                user[column] = self._dictionaries[column][self._codes[column][index]]
+            else:
+                offsets, data = self._strings[column]
+                user[column] = str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+        return user
+
+    def get(self, user_id):
+        index = bisect.bisect_left(self._ids, user_id)
+        if index < self.count and self._ids[index] == user_id:
+            return self._row(index)
+        return None
+
+    def all(self):
+        return [self._row(index) for index in range(self.count)]
+
+    def filter(self, field, value):
+        return [self._row(index) for index in self._rows[field].get(value, ())]
+
+    def counts(self, field):
+        return dict(self._counts[field])
+
+    def query(self, filters=None, offset=0, limit=None, fields=None):
+        # Mesma semântica de UserStore.query, sobre as listas de linhas por
+        # valor: com um filtro a página é uma fatia da lista (sem cópia)
+        filters = filters or {}
+        stop = None if limit is None else offset + limit
+        if not filters:
+            total = self.count
+            rows = range(self.count)[offset:stop]
+        else:
+            rows = min(
+                (self._rows[field].get(value, ()) for field, value in filters.items()),
+                key=len
+            )
+            if len(filters) > 1:
+                checks = []
+                for field, value in filters.items():
+                    if value not in self._dictionaries[field]:
+                        rows = ()
+                        break
+                    checks.append((self._codes[field], self._dictionaries[field].index(value)))
+                rows = [index for index in rows if all(codes[index] == code for codes, code in checks)]
+            total = len(rows)
+            rows = rows[offset:stop]
+        return total, [self._row(index, fields) for index in rows]
+
+
+class SnapshotStore:
+    # Serve o snapshot em `path` e troca para um novo, sem reiniciar, quando
+    # o arquivo é substituído (os.replace/mv). A verificação é um os.stat a
+    # cada `check_interval` segundos, feito pela própria requisição. Quem já
+    # estava usando o snapshot anterior termina com ele; o mmap antigo é
+    # liberado quando a última referência some.
+
+    def __init__(self, path, check_interval=5.0, on_reload=None):
+        self.path = path
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
+        self.reloads = 0
+        self._load()
+
+    def _load(self):
+        start = time.perf_counter()
+        stat = os.stat(self.path)
+        self._snapshot = Snapshot(self.path)
+        self._stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        # Depois do snapshot: quem lê o epoch antes do snapshot nunca rotula
+        # dados antigos com o epoch novo. Igual em todos os workers.
+        self.epoch = hashlib.sha1(repr(self._stat_key).encode()).hexdigest()[:16]
+        self.load_ms = round((time.perf_counter() - start) * 1000, 3)
+        self.loaded_at = datetime.now().isoformat()
+        self._next_check = time.monotonic() + self.check_interval
+
+    def _maybe_reload(self):
+        # Só uma thread verifica; as demais seguem com o snapshot atual
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self._next_check:
+                return
+            self._next_check = time.monotonic() + self.check_interval
+            stat = os.stat(self.path)
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._stat_key:
+                return
+            self._load()
+            self.reloads += 1
+            print(f"Snapshot recarregado: {self.path} ({len(self._snapshot)} usuários)")
+        except (OSError, ValueError) as e:
+            print(f"Erro ao recarregar snapshot {self.path}: {e}")
+            return
+        finally:
+            self._reload_lock.release()
+        if self.on_reload is not None:
+            self.on_reload()
+
+    def refresh(self):
+        if time.monotonic() >= self._next_check:
+            self._maybe_reload()
+
+    @property
+    def current(self):
+        self.refresh()
+        return self._snapshot
+
+    def __len__(self):
+        return len(self.current)
+
+    def get(self, user_id):
+        return self.current.get(user_id)
+
+    def all(self):
+        return self.current.all()
+
+    def filter(self, field, value):
+        return self.current.filter(field, value)
+
+    def counts(self, field):
+        return self.current.counts(field)
+
+    def query(self, filters=None, offset=0, limit=None, fields=None):
+        return self.current.query(filters, offset, limit, fields)
+
+    def changes(self, epoch, since):
+        # Um snapshot não muda: a única mudança possível é a troca do arquivo,
+        # que começa outro epoch e exige ressincronização
+        self.refresh()
+        current = self.epoch
+        return current, 0, [] if epoch == current and since == 0 else None
+
+    def resync(self):
+        epoch = self.epoch
+        return epoch, 0, self.current.all()
+
+    def stats(self):
+        snapshot = self.current
+        return {
+            'backend': 'snapshot',
+            'path': self.path,
+            'users': len(snapshot),
+            'created_at': snapshot.created_at,
+            'loaded_at': self.loaded_at,
+            'load_ms': self.load_ms,
+            'reloads': self.reloads,
+            'epoch': self.epoch,
+            'peak_rss_kb': peak_rss_kb()
+        }
+
+
+# ---------- linha de comando ----------
+
+STATUS_WEIGHTS = {'active': 85, 'inactive': 10, 'suspended': 5}
+ROLE_WEIGHTS = {'user': 90, 'moderator': 8, 'admin': 2}
+
+
+def generate_users(count, seed=42):
+    rng = random.Random(seed)
+    statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=count)
+    roles = rng.choices(list(ROLE_WEIGHTS), weights=list(ROLE_WEIGHTS.values()), k=count)
+    first_day = date(2020, 1, 1)
+    for index in range(count):
+        user_id = index + 1
+        yield {
+            'id': user_id,
+            'name': f'Usuário {user_id}',
+            'email': f'usuario{user_id}@example.com',
+            'status': statuses[index],
+            'role': roles[index],
+            'registration_date': (first_day + timedelta(days=rng.randrange(1500))).isoformat()
+        }
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def benchmark(path, lookups=100000):
+    def memory():
+        fields = rss_breakdown_kb()
+        if not fields:
+            return f"pico de RSS {peak_rss_kb() / 1024:.1f} MB"
+        return f"RSS privado {fields['RssAnon'] / 1024:.1f} MB, páginas do arquivo {fields['RssFile'] / 1024:.1f} MB"
+
+    rng = random.Random(1)
+    print(f"Arquivo:            {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    print(f"Antes de abrir:     {memory()}")
+
+    start = time.perf_counter()
+    snapshot = Snapshot(path)
+    print(f"Abertura:           {(time.perf_counter() - start) * 1000:.2f} ms, {len(snapshot)} usuários; {memory()}")
+
+    ids = [rng.randint(1, len(snapshot)) for _ in range(lookups)]
+    start = time.perf_counter()
+    for user_id in ids:
+        snapshot.get(user_id)
+    elapsed = time.perf_counter() - start
+    print(f"GET por id:         {elapsed / lookups * 1e6:.2f} µs ({lookups} buscas aleatórias); {memory()}")
+
+    start = time.perf_counter()
+    counts = snapshot.counts('status')
+    print(f"Contagem por status: {(time.perf_counter() - start) * 1e6:.1f} µs {counts}")
+
+    start = time.perf_counter()
+    suspended = snapshot.filter('status', 'suspended')
+    print(f"Filtro por status:  {(time.perf_counter() - start) * 1000:.1f} ms ({len(suspended)} usuários); {memory()}")
+    print(f"Pico de RSS:        {peak_rss_kb() / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshots colunares de usuários do Service A')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help='Gera um snapshot com usuários sintéticos')
+    generate.add_argument('path')
+    generate.add_argument('--users', type=int, default=1000000)
+    generate.add_argument('--seed', type=int, default=42)
+
+    build = commands.add_parser('build', help='Converte NDJSON (um usuário por linha, ids crescentes)')
+    build.add_argument('source')
+    build.add_argument('path')
+
+    bench = commands.add_parser('bench', help='Mede abertura, buscas e RSS de um snapshot')
+    bench.add_argument('path')
+    bench.add_argument('--lookups', type=int, default=100000)
+
+    args = parser.parse_args()
+    if args.command == 'bench':
+        benchmark(args.path, args.lookups)
+        return
+
+    start = time.perf_counter()
+    users = generate_users(args.users, args.seed) if args.command == 'generate' else read_ndjson(args.source)
+    count = write_snapshot(args.path, users)
+    print(f"{count} usuários gravados em {args.path} em {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
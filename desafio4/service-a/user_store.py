@@ -0,0 +1,134 @@
+import itertools
+import threading
+from collections import Counter
+
+from change_log import ChangeLog
+
+
+class UserStore:
+    # Usuários em memória com índices: por id (hash), por status e por role
+    # (id -> usuário, na ordem de inserção), além de contadores por status e
+    # por role mantidos a cada escrita. Buscas por id e as estatísticas são
+    # O(1); filtrar por status/role é O(k), com k = usuários no resultado.
+    # Escritas são serializadas por um lock; leituras não bloqueiam. Cada
+    # escrita entra no `change_log` (os usuários iniciais, não: são a base) e
+    # depois chama `on_change`, para quem guarda respostas montadas a partir
+    # do store (ex.: ResponseCache.bump).
+
+    INDEXED_FIELDS = ('status', 'role')
+
+    def __init__(self, users=(), change_log_size=10000, change_log_epoch=None, on_change=None):
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._counts = {field: Counter() for field in self.INDEXED_FIELDS}
+        self.change_log = ChangeLog(epoch=change_log_epoch, max_entries=change_log_size)
+        for user in users:
+            self._put(user)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def _index(self, user):
+        for field in self.INDEXED_FIELDS:
+            value = user[field]
+            self._indexes[field].setdefault(value, {})[user['id']] = user
+            self._counts[field][value] += 1
+
+    def _unindex(self, user):
+        for field in self.INDEXED_FIELDS:
+            value = user[field]
+            bucket = self._indexes[field][value]
+            del bucket[user['id']]
+            if not bucket:
+                del self._indexes[field][value]
+            self._counts[field][value] -= 1
+            if not self._counts[field][value]:
+                del self._counts[field][value]
+
+    def _put(self, user):
+        previous = self._by_id.get(user['id'])
+        if previous is not None:
+            self._unindex(previous)
+        self._by_id[user['id']] = user
+        self._index(user)
+
+    def put(self, user):
+        # Insere ou substitui (pelo id); o usuário não deve ser alterado
+        # depois de inserido, senão os índices ficam desatualizados
+        with self._lock:
+            self._put(user)
+            self.change_log.record('upsert', user['id'], user)
+        self._changed()
+
+    def remove(self, user_id):
+        with self._lock:
+            user = self._by_id.pop(user_id, None)
+            if user is not None:
+                self._unindex(user)
+                self.change_log.record('delete', user_id)
+        if user is not None:
+            self._changed()
+        return user
+
+    def _changed(self):
+        # Fora do lock: o callback pode ter locks próprios
+        if self.on_change is not None:
+            self.on_change()
+
+    def get(self, user_id):
+        return self._by_id.get(user_id)
+
+    def all(self):
+        return list(self._by_id.values())
+
+    def filter(self, field, value):
+        return list(self._indexes[field].get(value, {}).values())
+
+    def counts(self, field):
+        return dict(self._counts[field])
+
+    def query(self, filters=None, offset=0, limit=None, fields=None):
+        # (total que casa com `filters`, usuários de offset a offset+limit).
+        # Com um filtro a página sai direto do índice, em O(offset + limit);
+        # com vários, percorre o menor índice e confere os demais campos.
+        # `fields` devolve só essas chaves de cada usuário.
+        filters = filters or {}
+        stop = None if limit is None else offset + limit
+        if not filters:
+            total = len(self._by_id)
+            users = list(itertools.islice(self._by_id.values(), offset, stop))
+        else:
+            field, value = min(filters.items(), key=lambda item: self._counts[item[0]][item[1]])
+            candidates = self._indexes[field].get(value, {})
+            if len(filters) == 1:
+                total = len(candidates)
+                users = list(itertools.islice(candidates.values(), offset, stop))
+            else:
+                matches = [
+                    user for user in list(candidates.values())
+                    if all(user[field] == value for field, value in filters.items())
+                ]
+                total = len(matches)
+                users = matches[offset:stop]
+        if fields:
+            users = [{field: user[field] for field in fields} for user in users]
+        return total, users
+
+    def changes(self, epoch, since):
+        # (epoch, seq atual, mudanças depois de `since` ou None)
+        seq, changes = self.change_log.since(epoch, since)
+        return self.change_log.epoch, seq, changes
+
+    def resync(self):
+        # (epoch, seq, todos os usuários) lidos juntos: nenhuma escrita no meio
+        with self._lock:
+            return self.change_log.epoch, self.change_log.seq, self.all()
+
+    def stats(self):
+        return {
+            'backend': 'memory',
+            'users': len(self._by_id),
+            'change_log': self.change_log.stats()
+        }
@@ -2,8 +2,10 @@ from flask import Flask, jsonify
 from datetime import datetime, timedelta
 import requests
 import os
-from dateutil import parser
-from dateutil.relativedelta import relativedelta
+
+from health import HealthChecker
+from service_a_client import ServiceAClient
+from user_view import UserViews
 
 app = Flask(__name__)
 
@@ -11,47 +13,64 @@ app = Flask(__name__)
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'Service-B')
 SERVICE_PORT = int(os.getenv('SERVICE_PORT', 5002))
 SERVICE_A_URL = os.getenv('SERVICE_A_URL', 'http://service-a:5001')
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', 3))
+SERVICE_A_TIMEOUT = float(os.getenv('SERVICE_A_TIMEOUT', 5))
+SERVICE_A_POOL_SIZE = int(os.getenv('SERVICE_A_POOL_SIZE', 10))
+USERS_CACHE_TTL = float(os.getenv('USERS_CACHE_TTL', 5))
+USERS_STALE_TTL = float(os.getenv('USERS_STALE_TTL', 300))
+
+# Views materializadas, atualizadas só com o que muda no Service A
+user_views = UserViews()
+
+service_a = ServiceAClient(
+    SERVICE_A_URL,
+    listener=user_views,
+    timeout=SERVICE_A_TIMEOUT,
+    ttl=USERS_CACHE_TTL,
+    stale_ttl=USERS_STALE_TTL,
+    pool_size=SERVICE_A_POOL_SIZE
+)
+
+def json_response(payload, **raw):
+    # Como jsonify, mas com campos (`raw`) já serializados: cada um é uma
+    # lista de pedaços de JSON, enviados como estão, sem montar um corpo único
+    body = [app.json.dumps(payload, separators=(',', ':'))[:-1]]
+    for key, pieces in raw.items():
+        body.append(f',"{key}":')
+        body.extend(pieces)
+    body.append('}\n')
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+def sync_users_from_service_a():
+    # Traz para `user_views` as mudanças do Service A (no máximo a cada
+    # USERS_CACHE_TTL segundos); False se não houver dados nem antigos
+    return service_a.sync_users()
 
-def calculate_time_since(date_string):
-
-    try:
-        registration_date = parser.parse(date_string)
-        now = datetime.now()
-
-        diff = relativedelta(now, registration_date)
-
-        parts = []
-        if diff.years > 0:
-            parts.append(f"{diff.years} ano{'s' if diff.years != 1 else ''}")
-        if diff.months > 0:
-            parts.append(f"{diff.months} mês{'es' if diff.months != 1 else ''}")
-        if diff.days > 0 and not parts:  # Só mostrar dias se não houver anos/meses
-            parts.append(f"{diff.days} dia{'s' if diff.days != 1 else ''}")
-        
-        if not parts:
-            return "hoje"
-        
-        return ", ".join(parts)
-    except:
-        return "data desconhecida"
-
-def fetch_users_from_service_a():
+def fetch_user_by_id_from_service_a(user_id):
     try:
-        response = requests.get(f"{SERVICE_A_URL}/users", timeout=5)
-        response.raise_for_status()
+        response = service_a.get(f"/users/{user_id}")
+        # O 404 do Service A traz {"error": ...} e é tratado pela rota
+        if response.status_code != 404:
+            response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Erro ao conectar com Service A: {e}")
         return None
 
-def fetch_user_by_id_from_service_a(user_id):
+def check_service_a():
     try:
-        response = requests.get(f"{SERVICE_A_URL}/users/{user_id}", timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao conectar com Service A: {e}")
-        return None
+        response = service_a.get("/health", timeout=HEALTH_TIMEOUT)
+        return "healthy" if response.status_code == 200 else "unhealthy"
+    except requests.exceptions.RequestException:
+        return "unreachable"
+
+# Verificado em segundo plano: sondas frequentes não chegam ao Service A
+health_checker = HealthChecker(
+    {'service-a': check_service_a},
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_TIMEOUT
+)
 
 @app.route('/')
 def home():
@@ -73,70 +92,29 @@ def home():
 
 @app.route('/health')
 def health():
-    service_a_status = "unknown"
-    
-    try:
-        response = requests.get(f"{SERVICE_A_URL}/health", timeout=3)
-        if response.status_code == 200:
-            service_a_status = "healthy"
-        else:
-            service_a_status = "unhealthy"
-    except:
-        service_a_status = "unreachable"
-    
-    all_healthy = service_a_status == "healthy"
+    dependencies, checked_at = health_checker.status()
+    all_healthy = dependencies['service-a'] == "healthy"
     
     return jsonify({
         "status": "healthy" if all_healthy else "degraded",
         "service": SERVICE_NAME,
-        "dependencies": {
-            "service-a": service_a_status
-        },
+        "dependencies": dependencies,
+        "checked_at": checked_at,
+        "service_a_client": service_a.stats(),
+        "user_views": user_views.stats(),
         "timestamp": datetime.now().isoformat()
     }), 200 if all_healthy else 503
 
 @app.route('/user-info')
 def get_user_info():
-    data = fetch_users_from_service_a()
-    
-    if not data:
+    if not sync_users_from_service_a():
         return jsonify({
             "service": SERVICE_NAME,
             "error": "Não foi possível conectar ao Service A",
             "timestamp": datetime.now().isoformat()
         }), 503
     
-    formatted_users = []
-    for user in data.get('users', []):
-        time_since = calculate_time_since(user['registration_date'])
-        
-        status_emoji = {
-            'active': '✅',
-            'inactive': '⏸️',
-            'suspended': '🚫'
-        }.get(user['status'], '❓')
-        
-        role_emoji = {
-            'admin': '👑',
-            'moderator': '🛡️',
-            'user': '👤'
-        }.get(user['role'], '👤')
-        
-        formatted_info = (
-            f"{status_emoji} Usuário {user['name']} ({role_emoji} {user['role']}) "
-            f"está {user['status']} desde {time_since} atrás"
-        )
-        
-        formatted_users.append({
-            "id": user['id'],
-            "name": user['name'],
-            "email": user['email'],
-            "status": user['status'],
-            "role": user['role'],
-            "registration_date": user['registration_date'],
-            "time_since_registration": time_since,
-            "formatted_message": formatted_info
-        })
+    formatted_users = user_views.user_info()
     
     return jsonify({
         "service": SERVICE_NAME,
@@ -165,64 +143,25 @@ def get_single_user_info(user_id):
             "timestamp": datetime.now().isoformat()
         }), 404
     
-    user = data.get('user', {})
-    time_since = calculate_time_since(user['registration_date'])
-    
-    status_emoji = {
-        'active': '✅',
-        'inactive': '⏸️',
-        'suspended': '🚫'
-    }.get(user['status'], '❓')
-    
-    role_emoji = {
-        'admin': '👑',
-        'moderator': '🛡️',
-        'user': '👤'
-    }.get(user['role'], '👤')
-    
-    formatted_info = (
-        f"{status_emoji} Usuário {user['name']} ({role_emoji} {user['role']}) "
-        f"está {user['status']} desde {time_since} atrás"
-    )
+    user = user_views.describe(data.get('user', {}))
     
     return jsonify({
         "service": SERVICE_NAME,
         "source": "Service A",
-        "user": {
-            "id": user['id'],
-            "name": user['name'],
-            "email": user['email'],
-            "status": user['status'],
-            "role": user['role'],
-            "registration_date": user['registration_date'],
-            "time_since_registration": time_since,
-            "formatted_message": formatted_info
-        },
+        "user": user,
         "timestamp": datetime.now().isoformat()
     }), 200
 
 @app.route('/active-users')
 def get_active_users():
-    data = fetch_users_from_service_a()
-    
-    if not data:
+    if not sync_users_from_service_a():
         return jsonify({
             "service": SERVICE_NAME,
             "error": "Não foi possível conectar ao Service A",
             "timestamp": datetime.now().isoformat()
         }), 503
     
-    active_users = []
-    for user in data.get('users', []):
-        if user['status'] == 'active':
-            time_since = calculate_time_since(user['registration_date'])
-            
-            active_users.append({
-                "name": user['name'],
-                "email": user['email'],
-                "role": user['role'],
-                "message": f"✅ {user['name']} ativo desde {time_since}"
-            })
+    active_users = user_views.active_users()
     
     return jsonify({
         "service": SERVICE_NAME,
@@ -234,61 +173,23 @@ def get_active_users():
 
 @app.route('/summary')
 def get_summary():
-    data = fetch_users_from_service_a()
-    
-    if not data:
+    if not sync_users_from_service_a():
         return jsonify({
             "service": SERVICE_NAME,
             "error": "Não foi possível conectar ao Service A",
             "timestamp": datetime.now().isoformat()
         }), 503
     
-    users = data.get('users', [])
-    
-    status_count = {}
-    role_count = {}
-    oldest_user = None
-    newest_user = None
-    
-    for user in users:
-        status = user['status']
-        status_count[status] = status_count.get(status, 0) + 1
-        
-        role = user['role']
-        role_count[role] = role_count.get(role, 0) + 1
-        
-        reg_date = parser.parse(user['registration_date'])
-        if not oldest_user or reg_date < parser.parse(oldest_user['registration_date']):
-            oldest_user = user
-        if not newest_user or reg_date > parser.parse(newest_user['registration_date']):
-            newest_user = user
-    
-    summary_messages = []
-    for user in users:
-        time_since = calculate_time_since(user['registration_date'])
-        summary_messages.append(
-            f"{user['name']} ({user['status']}) - registrado há {time_since}"
-        )
+    summary, messages_json = user_views.summary()
     
-    return jsonify({
+    # A lista de mensagens (uma por usuário) já vem serializada da view, em
+    # blocos; só o resumo e o timestamp são serializados a cada requisição
+    return json_response({
         "service": SERVICE_NAME,
         "source": "Service A",
-        "summary": {
-            "total_users": len(users),
-            "by_status": status_count,
-            "by_role": role_count,
-            "oldest_user": {
-                "name": oldest_user['name'] if oldest_user else None,
-                "registered": calculate_time_since(oldest_user['registration_date']) if oldest_user else None
-            },
-            "newest_user": {
-                "name": newest_user['name'] if newest_user else None,
-                "registered": calculate_time_since(newest_user['registration_date']) if newest_user else None
-            }
-        },
-        "all_users_summary": summary_messages,
+        "summary": summary,
         "timestamp": datetime.now().isoformat()
-    }), 200
+    }, all_users_summary=messages_json), 200
 
 @app.errorhandler(404)
 def not_found(error):
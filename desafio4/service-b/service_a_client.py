@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _Flight:
+    # Busca em andamento: quem chega depois espera o resultado do primeiro
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class ServiceAClient:
+    # Cliente HTTP do Service A:
+    #  - Session com pool de conexões keep-alive (uma por processo, criada
+    #    após o fork) e uma nova tentativa em falhas de conexão;
+    #  - os usuários são acompanhados pelo feed GET /users/changes: a
+    #    primeira chamada traz a lista inteira e as seguintes só o que mudou
+    #    desde o último `seq`, repassado ao `listener` (`sync(users)` numa
+    #    ressincronização, `apply(changes)` nas demais);
+    #  - o feed é consultado no máximo a cada `ttl` segundos, e consultas
+    #    concorrentes viram uma única chamada ao Service A;
+    #  - se o Service A falhar, o listener continua com os últimos dados por
+    #    até `stale_ttl` segundos (stale-if-error).
+
+    def __init__(self, base_url, listener, timeout=5.0, ttl=5.0, stale_ttl=300.0, pool_size=10, retries=1):
+        self.base_url = base_url
+        self.listener = listener
+        self.timeout = timeout
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.pool_size = pool_size
+        self.retries = retries
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+        self._epoch = None
+        self._seq = None
+        self._synced_at = None
+        self._retry_at = 0.0
+        self._flight = None
+
+        self.hits = 0
+        self.deltas = 0
+        self.resyncs = 0
+        self.changes_received = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.errors = 0
+
+    @property
+    def session(self):
+        # Conexões não podem ser herdadas do master pelos workers do Gunicorn
+        pid = os.getpid()
+        if self._session_pid != pid:
+            with self._lock:
+                if self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_size,
+                        max_retries=Retry(total=self.retries, read=0, status=0, backoff_factor=0.1)
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def get(self, path, timeout=None, **kwargs):
+        return self.session.get(f'{self.base_url}{path}', timeout=timeout or self.timeout, **kwargs)
+
+    def _pull_changes(self):
+        params = {'epoch': self._epoch, 'since': self._seq} if self._epoch else {}
+        response = self.get('/users/changes', params=params)
+        response.raise_for_status()
+        payload = response.json()
+        if payload['resync']:
+            self.listener.sync(payload['users'])
+        elif payload['changes']:
+            self.listener.apply(payload['changes'])
+        with self._lock:
+            if payload['resync']:
+                self.resyncs += 1
+            else:
+                self.deltas += 1
+                self.changes_received += len(payload['changes'])
+            self._epoch = payload['epoch']
+            self._seq = payload['seq']
+            self._synced_at = time.monotonic()
+
+    def sync_users(self):
+        # True se o listener tem os usuários (atuais ou, com o Service A fora,
+        # de até `stale_ttl` segundos atrás); False se nunca sincronizou
+        with self._lock:
+            now = time.monotonic()
+            age = now - self._synced_at if self._synced_at is not None else None
+            if age is not None and age < self.ttl:
+                self.hits += 1
+                return True
+            # Depois de uma falha, espera `ttl` segundos antes de tentar de novo
+            if age is not None and now < self._retry_at and age < self.stale_ttl:
+                self.stale_served += 1
+                return True
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait(self.timeout * (self.retries + 1) + 1)
+            return bool(flight.result)
+
+        try:
+            self._pull_changes()
+            flight.result = True
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"Erro ao conectar com Service A: {e}")
+            with self._lock:
+                self.errors += 1
+                self._retry_at = time.monotonic() + self.ttl
+                if age is not None and age < self.stale_ttl:
+                    self.stale_served += 1
+                    flight.result = True
+        finally:
+            with self._lock:
+                self._flight = None
+            flight.done.set()
+        return bool(flight.result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cache_ttl_seconds': self.ttl,
+                'stale_ttl_seconds': self.stale_ttl,
+                'epoch': self._epoch,
+                'seq': self._seq,
+                'synced_age_seconds': round(time.monotonic() - self._synced_at, 3)
+                if self._synced_at is not None else None,
+                'hits': self.hits,
+                'deltas': self.deltas,
+                'resyncs': self.resyncs,
+                'changes_received': self.changes_received,
+                'coalesced': self.coalesced,
+                'stale_served': self.stale_served,
+                'errors': self.errors
+            }
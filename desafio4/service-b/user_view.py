@@ -0,0 +1,403 @@
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from dateutil import parser
+from dateutil.relativedelta import relativedelta
+
+STATUS_EMOJI = {
+    'active': '✅',
+    'inactive': '⏸️',
+    'suspended': '🚫'
+}
+
+ROLE_EMOJI = {
+    'admin': '👑',
+    'moderator': '🛡️',
+    'user': '👤'
+}
+
+UNKNOWN_DATE = "data desconhecida"
+
+# Mensagens do /summary por bloco de posições: uma mudança re-serializa um bloco
+MESSAGE_BLOCK_SIZE = 1024
+
+
+def parse_date(value):
+    # O Service A envia YYYY-MM-DD; o dateutil fica para outros formatos
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parser.parse(value).date()
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def format_time_since(registered, today):
+    if registered is None:
+        return UNKNOWN_DATE
+
+    diff = relativedelta(today, registered)
+
+    parts = []
+    if diff.years > 0:
+        parts.append(f"{diff.years} ano{'s' if diff.years != 1 else ''}")
+    if diff.months > 0:
+        parts.append(f"{diff.months} mês{'es' if diff.months != 1 else ''}")
+    if diff.days > 0 and not parts:  # Só mostrar dias se não houver anos/meses
+        parts.append(f"{diff.days} dia{'s' if diff.days != 1 else ''}")
+
+    if not parts:
+        return "hoje"
+
+    return ", ".join(parts)
+
+
+def _increment(counts, key, delta):
+    counts[key] = counts.get(key, 0) + delta
+    if not counts[key]:
+        del counts[key]
+
+
+class DerivedUser:
+    # Usuário com a data já convertida e as partes fixas das mensagens
+    # montadas; só o "tempo desde o registro" depende do dia. `position` é
+    # a ordem do usuário na lista (desempata o mais antigo/mais novo).
+
+    __slots__ = ('user', 'position', 'registered', 'message_prefix', 'active_prefix', 'summary_prefix')
+
+    def __init__(self, user, position=0):
+        self.user = user
+        self.position = position
+        self.registered = parse_date(user['registration_date'])
+        status_emoji = STATUS_EMOJI.get(user['status'], '❓')
+        role_emoji = ROLE_EMOJI.get(user['role'], '👤')
+        self.message_prefix = (
+            f"{status_emoji} Usuário {user['name']} ({role_emoji} {user['role']}) "
+            f"está {user['status']} desde "
+        )
+        self.active_prefix = f"✅ {user['name']} ativo desde "
+        self.summary_prefix = f"{user['name']} ({user['status']}) - registrado há "
+
+    def info(self, time_since):
+        user = self.user
+        return {
+            "id": user['id'],
+            "name": user['name'],
+            "email": user['email'],
+            "status": user['status'],
+            "role": user['role'],
+            "registration_date": user['registration_date'],
+            "time_since_registration": time_since,
+            "formatted_message": f"{self.message_prefix}{time_since} atrás"
+        }
+
+
+class UserViews:
+    # Campos derivados da lista de usuários do Service A, materializados e
+    # mantidos de forma incremental. Cada usuário adicionado, alterado ou
+    # removido (`put`/`remove`) atualiza só a parte dele: contadores por
+    # status e role, o índice por data (mais antigo/mais novo) e as linhas
+    # já montadas de /user-info, /active-users e /summary. As mudanças vêm
+    # do feed do Service A (`apply`) ou de uma lista completa (`sync`). Os
+    # textos de "tempo desde" são memorizados por data e, na virada do dia,
+    # todas as linhas são remontadas uma vez. As mensagens do /summary ficam em JSON,
+    # em blocos de MESSAGE_BLOCK_SIZE usuários já concatenados; uma mudança
+    # refaz só o bloco do usuário. O que as rotas leem é montado na primeira
+    # leitura de cada versão.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._by_status = {}
+        self._by_role = {}
+        self._dates = {}
+        self._oldest = None
+        self._newest = None
+        self._extremes_dirty = False
+        self._info = {}
+        self._active = {}
+        self._message_blocks = {}
+        self._joined_blocks = {}
+        self._cache = {}
+        self._time_since = {}
+        self._next_position = 0
+        self.day = date.today()
+        self.version = 0
+        self.syncs = 0
+        self.changes_applied = 0
+        self.days_rendered = 1
+
+    def __len__(self):
+        return len(self._users)
+
+    def _time_since_for(self, registered):
+        text = self._time_since.get(registered)
+        if text is None:
+            text = self._time_since[registered] = format_time_since(registered, self.day)
+        return text
+
+    def _render_user(self, derived):
+        user = derived.user
+        since = self._time_since_for(derived.registered)
+        self._info[user['id']] = derived.info(since)
+        # None mantém a posição do usuário na ordem da lista de ativos
+        self._active[user['id']] = {
+            "name": user['name'],
+            "email": user['email'],
+            "role": user['role'],
+            "message": f"{derived.active_prefix}{since}"
+        } if user['status'] == 'active' else None
+        block = derived.position // MESSAGE_BLOCK_SIZE
+        self._message_blocks.setdefault(block, {})[derived.position] = json.dumps(
+            f"{derived.summary_prefix}{since}"
+        )
+        self._joined_blocks.pop(block, None)
+
+    def _set_day(self, today):
+        if today == self.day:
+            return
+        self.day = today
+        self._time_since = {}
+        self._message_blocks, self._joined_blocks = {}, {}
+        for derived in self._users.values():
+            self._render_user(derived)
+        self._cache = {}
+        self.days_rendered += 1
+
+    def _index(self, derived):
+        user = derived.user
+        _increment(self._by_status, user['status'], 1)
+        _increment(self._by_role, user['role'], 1)
+        registered = derived.registered
+        if registered is None:
+            return
+        self._dates.setdefault(registered, {})[user['id']] = derived
+        if not self._extremes_dirty:
+            if self._oldest is None or registered < self._oldest:
+                self._oldest = registered
+            if self._newest is None or registered > self._newest:
+                self._newest = registered
+
+    def _unindex(self, derived):
+        user = derived.user
+        _increment(self._by_status, user['status'], -1)
+        _increment(self._by_role, user['role'], -1)
+        registered = derived.registered
+        if registered is None:
+            return
+        bucket = self._dates[registered]
+        del bucket[user['id']]
+        if not bucket:
+            del self._dates[registered]
+            if registered in (self._oldest, self._newest):
+                # Recalculado na próxima leitura, sobre as datas distintas
+                self._extremes_dirty = True
+
+    def _store(self, user):
+        # Um usuário alterado mantém a posição na ordem (como no Service A)
+        previous = self._users.get(user['id'])
+        if previous is not None:
+            if previous.user == user:
+                return False
+            self._unindex(previous)
+            position = previous.position
+        else:
+            position = self._next_position
+            self._next_position += 1
+        derived = self._users[user['id']] = DerivedUser(user, position)
+        self._index(derived)
+        self._render_user(derived)
+        return True
+
+    def _discard(self, user_id):
+        derived = self._users.pop(user_id, None)
+        if derived is None:
+            return False
+        self._unindex(derived)
+        del self._info[user_id]
+        del self._active[user_id]
+        block = derived.position // MESSAGE_BLOCK_SIZE
+        messages = self._message_blocks[block]
+        del messages[derived.position]
+        if not messages:
+            del self._message_blocks[block]
+        self._joined_blocks.pop(block, None)
+        return True
+
+    def _changed(self, changes):
+        if changes:
+            self.version += 1
+            self.changes_applied += changes
+            self._cache = {}
+
+    def put(self, user):
+        # Insere ou substitui (pelo id)
+        with self._lock:
+            self._changed(self._store(user))
+
+    def remove(self, user_id):
+        with self._lock:
+            self._changed(self._discard(user_id))
+
+    def sync(self, users):
+        # Aplica a diferença entre a lista atual e `users` (ressincronização
+        # completa): só usuários novos, alterados ou removidos atualizam a view
+        with self._lock:
+            changes = 0
+            seen = set()
+            for user in users:
+                seen.add(user['id'])
+                changes += self._store(user)
+            for user_id in [user_id for user_id in self._users if user_id not in seen]:
+                changes += self._discard(user_id)
+            self._changed(changes)
+            self.syncs += 1
+            return changes
+
+    def apply(self, changes):
+        # Mudanças do feed GET /users/changes do Service A
+        with self._lock:
+            applied = 0
+            for change in changes:
+                if change['op'] == 'delete':
+                    applied += self._discard(change['id'])
+                else:
+                    applied += self._store(change['user'])
+            self._changed(applied)
+            return applied
+
+    def _edge(self, registered):
+        if registered is None:
+            return {"name": None, "registered": None}
+        # Empate na data: o primeiro na ordem da lista, como o laço original
+        derived = min(self._dates[registered].values(), key=lambda derived: derived.position)
+        return {
+            "name": derived.user['name'],
+            "registered": self._time_since_for(registered)
+        }
+
+    def _summary(self):
+        if self._extremes_dirty:
+            self._oldest = min(self._dates) if self._dates else None
+            self._newest = max(self._dates) if self._dates else None
+            self._extremes_dirty = False
+        return {
+            "total_users": len(self._users),
+            "by_status": dict(self._by_status),
+            "by_role": dict(self._by_role),
+            "oldest_user": self._edge(self._oldest),
+            "newest_user": self._edge(self._newest)
+        }
+
+    def _read(self, name, build):
+        with self._lock:
+            self._set_day(date.today())
+            value = self._cache.get(name)
+            if value is None:
+                value = self._cache[name] = build()
+            return value
+
+    def user_info(self):
+        return self._read('user_info', lambda: list(self._info.values()))
+
+    def active_users(self):
+        return self._read('active_users', lambda: list(filter(None, self._active.values())))
+
+    def _messages_json(self):
+        # Pedaços que, concatenados, formam o JSON da lista de mensagens
+        pieces = ['[']
+        for block, messages in self._message_blocks.items():
+            joined = self._joined_blocks.get(block)
+            if joined is None:
+                joined = self._joined_blocks[block] = ','.join(messages.values())
+            if len(pieces) > 1:
+                pieces.append(',')
+            pieces.append(joined)
+        pieces.append(']')
+        return pieces
+
+    def summary(self):
+        # (resumo, pedaços do JSON da lista de mensagens)
+        return self._read('summary', lambda: (self._summary(), self._messages_json()))
+
+    def describe(self, user):
+        # Um usuário avulso (ex.: GET /users/<id>), fora do conjunto materializado
+        derived = DerivedUser(user)
+        with self._lock:
+            self._set_day(date.today())
+            return derived.info(self._time_since_for(derived.registered))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'version': self.version,
+                'syncs': self.syncs,
+                'changes_applied': self.changes_applied,
+                'days_rendered': self.days_rendered,
+                'day': self.day.isoformat()
+            }
+
+
+def _generate_users(count, seed=42):
+    rng = random.Random(seed)
+    first_day = date(2020, 1, 1)
+    for user_id in range(1, count + 1):
+        yield {
+            'id': user_id,
+            'name': f'Usuário {user_id}',
+            'email': f'user{user_id}@example.com',
+            'status': rng.choice(('active', 'active', 'inactive', 'suspended')),
+            'role': rng.choice(('user', 'user', 'user', 'moderator', 'admin')),
+            'registration_date': (first_day + timedelta(days=rng.randrange(1500))).isoformat()
+        }
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _bench(sizes, repeat):
+    # Custo do /summary com a view materializada: leitura sem mudanças e
+    # leitura logo após um usuário alterado, em função do total de usuários
+    print(f"{'usuários':>10} {'carga':>10} {'leitura':>10} {'1 mudança':>10} {'+ leitura':>10}")
+    for size in sizes:
+        views = UserViews()
+        start = time.perf_counter()
+        for user in _generate_users(size):
+            views.put(user)
+        load = (time.perf_counter() - start) * 1000
+
+        def read():
+            summary, messages_json = views.summary()
+            return json.dumps(summary), len(messages_json)
+
+        read()
+        warm = _timed(read, repeat)
+        rng = random.Random(size)
+
+        def change():
+            user = dict(views._users[rng.randrange(1, size + 1)].user)
+            user['status'] = rng.choice(('active', 'inactive', 'suspended'))
+            views.put(user)
+
+        put = _timed(change, repeat)
+        changed = _timed(lambda: (change(), read()), repeat)
+        print(f"{size:>10} {load:>8.0f}ms {warm:>8.3f}ms {put:>8.3f}ms {changed:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark das views materializadas do Service B')
+    arg_parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+    _bench([int(size) for size in args.sizes.split(',')], args.repeat)
@@ -4,13 +4,22 @@ import requests
 import os
 import json
 
+from health import HealthChecker
+
 app = Flask(__name__)
 
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'API Gateway')
 SERVICE_PORT = int(os.getenv('SERVICE_PORT', 8000))
 USERS_SERVICE_URL = os.getenv('USERS_SERVICE_URL', 'http://users-service:5001')
 ORDERS_SERVICE_URL = os.getenv('ORDERS_SERVICE_URL', 'http://orders-service:5002')
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', 3))
     
+# Cabeçalhos de cache/validação repassados entre o cliente e os serviços,
+# para que um 304 do serviço chegue ao cliente
+CONDITIONAL_REQUEST_HEADERS = ('If-None-Match', 'If-Modified-Since')
+CACHE_RESPONSE_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
 request_counter = {
     'total': 0,
     'users': 0,
@@ -25,7 +34,11 @@ def forward_request(service_url, path, method='GET'):
         request_counter['total'] += 1
         
         if method == 'GET':
-            response = requests.get(url, timeout=10)
+            headers = {
+                name: request.headers[name]
+                for name in CONDITIONAL_REQUEST_HEADERS if name in request.headers
+            }
+            response = requests.get(url, headers=headers, timeout=10)
         elif method == 'POST':
             response = requests.post(
                 url, 
@@ -48,6 +61,10 @@ def forward_request(service_url, path, method='GET'):
         return Response(
             response.content,
             status=response.status_code,
+            headers={
+                name: response.headers[name]
+                for name in CACHE_RESPONSE_HEADERS if name in response.headers
+            },
             content_type='application/json'
         )
     
@@ -74,6 +91,23 @@ def forward_request(service_url, path, method='GET'):
             'gateway': SERVICE_NAME
         }), 500
 
+def check_service(service_url):
+    try:
+        response = requests.get(f"{service_url}/health", timeout=HEALTH_TIMEOUT)
+        return 'healthy' if response.status_code == 200 else 'unhealthy'
+    except requests.exceptions.RequestException:
+        return 'unreachable'
+
+# Os dois serviços são verificados em paralelo, em segundo plano; o /health só lê o resultado
+health_checker = HealthChecker(
+    {
+        'users_service': lambda: check_service(USERS_SERVICE_URL),
+        'orders_service': lambda: check_service(ORDERS_SERVICE_URL)
+    },
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_TIMEOUT
+)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -100,27 +134,18 @@ def home():
 
 @app.route('/health')
 def health():
+    checks, checked_at = health_checker.status()
     health_status = {
         'gateway': 'healthy',
+        **checks,
+        'checked_at': checked_at,
         'timestamp': datetime.now().isoformat()
     }
     
-    try:
-        response = requests.get(f"{USERS_SERVICE_URL}/health", timeout=3)
-        health_status['users_service'] = 'healthy' if response.status_code == 200 else 'unhealthy'
-    except:
-        health_status['users_service'] = 'unreachable'
-    
-    try:
-        response = requests.get(f"{ORDERS_SERVICE_URL}/health", timeout=3)
-        health_status['orders_service'] = 'healthy' if response.status_code == 200 else 'unhealthy'
-    except:
-        health_status['orders_service'] = 'unreachable'
-    
     all_healthy = all(
         v == 'healthy' 
         for k, v in health_status.items() 
-        if k not in ['timestamp']
+        if k not in ['timestamp', 'checked_at']
     )
     
     health_status['overall'] = 'healthy' if all_healthy else 'degraded'
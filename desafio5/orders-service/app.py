@@ -4,11 +4,15 @@ import os
 import requests
 import random
 
+from health import HealthChecker
+
 app = Flask(__name__)
 
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'Orders Service')
 SERVICE_PORT = int(os.getenv('SERVICE_PORT', 5002))
 USERS_SERVICE_URL = os.getenv('USERS_SERVICE_URL', 'http://users-service:5001')
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 5))
+HEALTH_TIMEOUT = float(os.getenv('HEALTH_TIMEOUT', 3))
 
 orders_db = {
     1: {
@@ -52,6 +56,20 @@ def get_user_info(user_id):
     except:
         return None
 
+def check_users_service():
+    try:
+        response = requests.get(f"{USERS_SERVICE_URL}/health", timeout=HEALTH_TIMEOUT)
+        return "healthy" if response.status_code == 200 else "unhealthy"
+    except requests.exceptions.RequestException:
+        return "unreachable"
+
+# Verificado em segundo plano: sondas frequentes não chegam ao Users Service
+health_checker = HealthChecker(
+    {'users_service': check_users_service},
+    interval=HEALTH_CHECK_INTERVAL,
+    timeout=HEALTH_TIMEOUT
+)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -73,20 +91,14 @@ def home():
 
 @app.route('/health')
 def health():
-    users_service_status = "unknown"
-    try:
-        response = requests.get(f"{USERS_SERVICE_URL}/health", timeout=3)
-        users_service_status = "healthy" if response.status_code == 200 else "unhealthy"
-    except:
-        users_service_status = "unreachable"
+    dependencies, checked_at = health_checker.status()
     
     return jsonify({
         "status": "healthy",
         "service": SERVICE_NAME,
         "orders_count": len(orders_db),
-        "dependencies": {
-            "users_service": users_service_status
-        },
+        "dependencies": dependencies,
+        "checked_at": checked_at,
         "timestamp": datetime.now().isoformat()
     }), 200
 
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+
+class HealthChecker:
+    # Verificações de dependências executadas em paralelo por uma thread de
+    # fundo a cada `interval` segundos; o endpoint /health só lê o último
+    # resultado, então uma sonda não gera nenhuma chamada às dependências.
+    # `checks` mapeia nome -> função que retorna o status ('healthy', ...);
+    # exceções viram 'unhealthy: <erro>' e quem passar de `timeout` segundos,
+    # 'unhealthy: timeout'.
+
+    def __init__(self, checks, interval=5.0, timeout=2.0):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        # Se a thread parar de atualizar, a próxima sonda verifica na hora
+        self.max_age = interval * 3
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._results = None
+        self._checked_at = None
+        self._checked_monotonic = 0.0
+        self._executor = None
+        self._runner_pid = None
+        # Último future de cada verificação, para não submeter de novo uma que ainda não voltou
+        self._pending = {}
+
+    def _ensure_runner(self):
+        # A thread (e o executor) são criados por processo, e recriados após um fork
+        pid = os.getpid()
+        if self._runner_pid == pid:
+            return
+        with self._lock:
+            if self._runner_pid == pid:
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self.checks),
+                thread_name_prefix='health'
+            )
+            self._results = None
+            self._pending = {}
+            self._runner_pid = pid
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except RuntimeError:
+                # Executor encerrado: o interpretador está finalizando
+                return
+            time.sleep(self.interval)
+
+    def _check(self, check):
+        try:
+            return check()
+        except Exception as e:
+            return f'unhealthy: {str(e)}'
+
+    def _is_fresh(self):
+        with self._lock:
+            return (
+                self._results is not None
+                and time.monotonic() - self._checked_monotonic <= self.max_age
+            )
+
+    def refresh(self, only_if_stale=False):
+        with self._refresh_lock:
+            # Várias sondas podem encontrar o resultado vencido ao mesmo tempo;
+            # só a primeira executa as verificações
+            if only_if_stale and self._is_fresh():
+                return
+            futures = {}
+            for name, check in self.checks.items():
+                # Uma verificação travada continua ocupando sua thread: submetê-la
+                # de novo a cada rodada esgotaria o executor e as demais também
+                # dariam timeout. Ela segue como 'timeout' até terminar.
+                future = self._pending.get(name)
+                if future is None or future.done():
+                    future = self._executor.submit(self._check, check)
+                    self._pending[name] = future
+                futures[name] = future
+            wait(futures.values(), timeout=self.timeout)
+            results = {
+                name: future.result() if future.done() else 'unhealthy: timeout'
+                for name, future in futures.items()
+            }
+            with self._lock:
+                self._results = results
+                self._checked_at = datetime.now().isoformat()
+                self._checked_monotonic = time.monotonic()
+
+    def status(self):
+        # Retorna ({nome: status}, horário da verificação)
+        self._ensure_runner()
+        if not self._is_fresh():
+            self.refresh(only_if_stale=True)
+        with self._lock:
+            return dict(self._results), self._checked_at
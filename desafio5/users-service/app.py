@@ -2,6 +2,8 @@ from flask import Flask, jsonify, request
 from datetime import datetime
 import os
 
+from response_cache import ResponseCache
+
 app = Flask(__name__)
 
 SERVICE_NAME = os.getenv('SERVICE_NAME', 'Users Service')
@@ -33,6 +35,9 @@ users_db = {
 
 next_user_id = max(users_db.keys()) + 1 if users_db else 1
 
+# Corpos das listagens serializados por versão; toda escrita chama bump()
+response_cache = ResponseCache()
+
 @app.route('/')
 def home():
     return jsonify({
@@ -61,12 +66,12 @@ def health():
 
 @app.route('/users', methods=['GET'])
 def get_users():
-    return jsonify({
+    return response_cache.response('users', lambda: {
         "service": SERVICE_NAME,
         "total_users": len(users_db),
         "users": list(users_db.values()),
         "timestamp": datetime.now().isoformat()
-    }), 200
+    })
 
 @app.route('/users', methods=['POST'])
 def create_user():
@@ -97,6 +102,7 @@ def create_user():
     
     users_db[next_user_id] = new_user
     next_user_id += 1
+    response_cache.bump()
     
     return jsonify({
         "service": SERVICE_NAME,
@@ -140,8 +146,7 @@ def update_user(user_id):
             'error': 'Dados inválidos'
         }), 400
     
-    if 'name' in data:
-        user['name'] = data['name']
+    # Valida antes de alterar: um 409 não deve deixar o usuário pela metade
     if 'email' in data:
         for uid, u in users_db.items():
             if uid != user_id and u['email'] == data['email']:
@@ -149,9 +154,14 @@ def update_user(user_id):
                     'service': SERVICE_NAME,
                     'error': 'Email já cadastrado'
                 }), 409
+    
+    if 'name' in data:
+        user['name'] = data['name']
+    if 'email' in data:
         user['email'] = data['email']
     if 'role' in data:
         user['role'] = data['role']
+    response_cache.bump()
     
     return jsonify({
         "service": SERVICE_NAME,
@@ -171,6 +181,7 @@ def delete_user(user_id):
         }), 404
     
     del users_db[user_id]
+    response_cache.bump()
     
     return jsonify({
         "service": SERVICE_NAME,
@@ -180,20 +191,23 @@ def delete_user(user_id):
 
 @app.route('/users/search/<query>')
 def search_users(query):
-    query_lower = query.lower()
-    
-    results = [
-        user for user in users_db.values()
-        if query_lower in user['name'].lower() or query_lower in user['email'].lower()
-    ]
-    
-    return jsonify({
-        "service": SERVICE_NAME,
-        "query": query,
-        "total_results": len(results),
-        "users": results,
-        "timestamp": datetime.now().isoformat()
-    }), 200
+    def build():
+        query_lower = query.lower()
+        
+        results = [
+            user for user in users_db.values()
+            if query_lower in user['name'].lower() or query_lower in user['email'].lower()
+        ]
+        
+        return {
+            "service": SERVICE_NAME,
+            "query": query,
+            "total_results": len(results),
+            "users": results,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    return response_cache.response(f'users/search/{query}', build)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,59 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+from flask import Response, current_app, request
+
+
+class ResponseCache:
+    # Corpos JSON já serializados, guardados por versão do conjunto de dados.
+    # Enquanto a versão não muda, cada rota é serializada uma única vez; o
+    # ETag (forte, hash do corpo) responde `If-None-Match` com 304 sem enviar
+    # o corpo de novo. Toda escrita chama `bump()`, que descarta os corpos.
+    # `max_entries` limita as chaves (ex.: um corpo por filtro da URL).
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._bodies = {}
+        self.version = 1
+        self.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            # Last-Modified tem resolução de segundos: duas escritas no mesmo
+            # segundo ainda precisam produzir datas diferentes
+            self.modified_at = max(
+                datetime.now(timezone.utc).replace(microsecond=0),
+                self.modified_at + timedelta(seconds=1)
+            )
+            self._bodies.clear()
+
+    def _entry(self, key, build):
+        with self._lock:
+            entry = self._bodies.get(key)
+            version = self.version
+        if entry is not None:
+            return entry
+
+        body = current_app.json.dumps(build()).encode()
+        entry = (body, hashlib.sha1(body).hexdigest())
+
+        with self._lock:
+            # Uma escrita durante a serialização torna este corpo antigo: não guarda
+            if self.version == version:
+                if len(self._bodies) >= self.max_entries:
+                    self._bodies.clear()
+                self._bodies[key] = entry
+        return entry
+
+    def response(self, key, build):
+        # `build()` monta o payload; só é chamado quando não há corpo em cache
+        body, etag = self._entry(key, build)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.last_modified = self.modified_at
+        # O cliente pode guardar a resposta, mas revalida a cada uso
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)